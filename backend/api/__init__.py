@@ -9,6 +9,28 @@ from .admin import admin_router
 from .address import router as address_router
 from .analytics import router as analytics_router
 from api.profile import router as profile_router
+from core.database import DB_ASYNC
+
+
+def use_async_routes(router: APIRouter, async_router: APIRouter):
+    """Replace sync routes with their async counterparts, keeping route order"""
+    for async_route in async_router.routes:
+        for index, route in enumerate(router.routes):
+            if route.path == async_route.path and route.methods == async_route.methods:
+                router.routes[index] = async_route
+                break
+
+
+if DB_ASYNC:
+    from .products_async import async_product_router
+    from .cart_async import async_cart_router
+    from .orders_async import async_orders_router
+    from .auth_async import async_auth_router
+
+    use_async_routes(product_router, async_product_router)
+    use_async_routes(cart_router, async_cart_router)
+    use_async_routes(orders_router, async_orders_router)
+    use_async_routes(auth_router, async_auth_router)
 
 
 api_version_one = APIRouter(prefix="/api/v1")
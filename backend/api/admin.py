@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from core.security import require_role
-from core.database import get_db
+from core.database import get_db, replica_set
+from core.pool_metrics import pool_status
+from core.cache import product_cache
+from core.outbox import outbox_stats, requeue_dead
+from core.email_utils import smtp_stats
+from core.streaming import export_response, ExportFormat
 from models.user import User
 from models.product import Product
 from models.order import Order
 from models.payment import PaymentTransaction
 from schemas.user import Token
-from typing import List
+from typing import List, Optional
 
 admin_router = APIRouter(
     prefix="/admin", tags=["admin"], dependencies=[Depends(require_role("admin"))]
@@ -44,3 +49,93 @@ def list_users(db: Session = Depends(get_db)):
 @admin_router.get("/payments")
 def list_payments(db: Session = Depends(get_db)):
     return db.query(PaymentTransaction).all()
+
+
+USER_EXPORT_COLUMNS = [
+    "id",
+    "email",
+    "full_name",
+    "role",
+    "is_active",
+    "email_verified",
+    "created_at",
+]
+PAYMENT_EXPORT_COLUMNS = [
+    "id",
+    "order_id",
+    "provider",
+    "transaction_id",
+    "status",
+    "amount",
+    "created_at",
+]
+
+
+@admin_router.get("/users/export")
+def export_users(format: ExportFormat = "ndjson", gzip: bool = False):
+    """Stream all active users as NDJSON or CSV"""
+    return export_response(
+        lambda db: db.query(*[getattr(User, c) for c in USER_EXPORT_COLUMNS])
+        .filter(User.is_deleted == False)
+        .order_by(User.id),
+        USER_EXPORT_COLUMNS,
+        "users",
+        format,
+        gzip,
+    )
+
+
+@admin_router.get("/payments/export")
+def export_payments(format: ExportFormat = "ndjson", gzip: bool = False):
+    """Stream all payment transactions as NDJSON or CSV"""
+    return export_response(
+        lambda db: db.query(
+            *[getattr(PaymentTransaction, c) for c in PAYMENT_EXPORT_COLUMNS]
+        ).order_by(PaymentTransaction.id),
+        PAYMENT_EXPORT_COLUMNS,
+        "payments",
+        format,
+        gzip,
+    )
+
+
+@admin_router.get("/db/pool")
+def get_pool_metrics():
+    """Connection pool state and checkout metrics for every engine"""
+    return pool_status()
+
+
+@admin_router.get("/db/replicas")
+def get_replica_status():
+    """Read replica weights and health"""
+    return replica_set.status()
+
+
+@admin_router.get("/cache")
+def get_cache_stats():
+    """Product cache size and hit/miss/eviction counters"""
+    return product_cache.stats()
+
+
+@admin_router.delete("/cache", status_code=204)
+def clear_cache():
+    """Drop every cached product entry (on all workers when broadcasting)"""
+    product_cache.clear()
+
+
+@admin_router.get("/email-outbox")
+def get_email_outbox(db: Session = Depends(get_db)):
+    """Queued email per status, the oldest pending one and recent dead letters"""
+    return outbox_stats(db)
+
+
+@admin_router.get("/email/smtp")
+def get_smtp_metrics():
+    """SMTP pool connections, send latency and throughput (this worker)"""
+    return smtp_stats()
+
+
+@admin_router.post("/email-outbox/requeue")
+def requeue_dead_email(ids: Optional[List[int]] = None, db: Session = Depends(get_db)):
+    """Retry dead-lettered email (all of it, or the given ids)"""
+    return {"requeued": requeue_dead(db, ids)}
@@ -3,9 +3,12 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, desc, extract
 from core.security import require_role
 from core.database import get_db
+from core.facets import facet_counts
+from core.views import top_viewed_products
+from core.stock_alerts import low_stock_counts
 from models.user import User
 from models.product import Product
-from models.order import Order
+from models.order import Order, OrderItem
 from models.payment import PaymentTransaction
 from schemas.analytics import (
     DashboardAnalytics,
@@ -36,7 +39,7 @@ def get_dashboard_analytics(
     return DashboardAnalytics(
         sales=get_sales_analytics(db, start_date, end_date),
         users=get_user_analytics(db, start_date, end_date),
-        products=get_product_analytics(db),
+        products=get_product_analytics(db, start_date, end_date),
         orders=get_order_analytics(db, start_date, end_date),
         last_updated=datetime.utcnow(),
     )
@@ -63,9 +66,13 @@ def get_user_analytics_endpoint(
 
 
 @router.get("/products", response_model=ProductAnalytics)
-def get_product_analytics_endpoint(db: Session = Depends(get_db)):
+def get_product_analytics_endpoint(
+    time_range: TimeRange = Depends(), db: Session = Depends(get_db)
+):
     """Get product analytics"""
-    return get_product_analytics(db)
+    start_date = time_range.start_date or (datetime.utcnow() - timedelta(days=30))
+    end_date = time_range.end_date or datetime.utcnow()
+    return get_product_analytics(db, start_date, end_date)
 
 
 @router.get("/orders", response_model=OrderAnalytics)
@@ -129,14 +136,15 @@ def get_sales_analytics(
         for row in monthly_sales
     ]
 
-    # Top selling products (by order count)
-    top_products = (
+    # Top selling products (by order count): aggregated per product over the
+    # line items, walking idx_order_item_product_order; names joined after
+    sales = (
         db.query(
-            Product.name,
-            func.count(Order.id).label("order_count"),
-            func.sum(Order.total_amount).label("total_revenue"),
+            OrderItem.product_id,
+            func.count(OrderItem.order_id).label("order_count"),
+            func.sum(OrderItem.price * OrderItem.quantity).label("total_revenue"),
         )
-        .join(Order, Product.id == Order.id)
+        .join(Order, Order.id == OrderItem.order_id)
         .filter(
             and_(
                 Order.created_at >= start_date,
@@ -144,9 +152,15 @@ def get_sales_analytics(
                 Order.status.in_(["paid", "shipped", "delivered"]),
             )
         )
-        .group_by(Product.id, Product.name)
+        .group_by(OrderItem.product_id)
         .order_by(desc("order_count"))
         .limit(10)
+        .subquery()
+    )
+    top_products = (
+        db.query(Product.name, sales.c.order_count, sales.c.total_revenue)
+        .join(sales, sales.c.product_id == Product.id)
+        .order_by(sales.c.order_count.desc())
         .all()
     )
 
@@ -284,38 +298,28 @@ def get_user_analytics(
     )
 
 
-def get_product_analytics(db: Session) -> ProductAnalytics:
+def get_product_analytics(
+    db: Session, start_date: datetime, end_date: datetime
+) -> ProductAnalytics:
     """Calculate product analytics"""
     # Total products
     total_products = db.query(Product).filter(Product.is_deleted == False).count()
 
-    # Low stock products (less than 10)
-    low_stock_products = (
-        db.query(Product)
-        .filter(
-            and_(Product.stock < 10, Product.stock > 0, Product.is_deleted == False)
-        )
-        .count()
-    )
-
-    # Out of stock products
-    out_of_stock_products = (
-        db.query(Product)
-        .filter(and_(Product.stock == 0, Product.is_deleted == False))
-        .count()
-    )
+    # Low stock (below LOW_STOCK_THRESHOLD) and out of stock products,
+    # from the maintained low-stock set
+    low_stock_products, out_of_stock_products = low_stock_counts(db)
 
-    # Top viewed products (placeholder - would need view tracking)
-    top_viewed_products = []
+    # Top viewed products in the date range (buffered hourly view counts)
+    top_viewed = top_viewed_products(db, start_date, end_date)
 
-    # Category distribution (placeholder - would need category field)
-    category_distribution = {}
+    # Category distribution (maintained facet counts)
+    category_distribution = facet_counts(db)["category"]
 
     return ProductAnalytics(
         total_products=total_products,
         low_stock_products=low_stock_products,
         out_of_stock_products=out_of_stock_products,
-        top_viewed_products=top_viewed_products,
+        top_viewed_products=top_viewed,
         category_distribution=category_distribution,
     )
 
@@ -12,8 +12,9 @@ from core.security import (
     create_refresh_token,
     decode_token,
 )
-from core.database import get_db
-from core.email_utils import send_email, render_template
+from core.database import get_db, use_primary
+from core.email_utils import render_template
+from core.outbox import enqueue_email
 import pyotp
 import secrets
 from datetime import datetime, timedelta
@@ -79,8 +80,6 @@ def register(
         email_verified=False,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
     verify_url = f"http://localhost:8000/auth/verify-email?token={verification_token}"
     html_body = render_template(
         "verification_email.html",
@@ -88,12 +87,15 @@ def register(
         email=new_user.email,
         verify_url=verify_url,
     )
-    send_email(
+    enqueue_email(
+        db,
         new_user.email,
         "Verify your email",
         f"Verify your email: {verify_url}",
         html_body=html_body,
     )
+    db.commit()
+    db.refresh(new_user)
     access_token = create_access_token(data={"sub": new_user.email})
     refresh_token = create_refresh_token(data={"sub": new_user.email})
     if response:
@@ -110,7 +112,7 @@ def register(
     }
 
 
-@router.get("/verify-email")
+@router.get("/verify-email", dependencies=[Depends(use_primary)])
 def verify_email(token: str, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.verification_token == token).first()
     if not user:
@@ -201,7 +203,6 @@ def request_password_reset(email: str, db: Session = Depends(get_db)):
     token = secrets.token_urlsafe(32)
     user.password_reset_token = token
     user.password_reset_expiry = datetime.utcnow() + timedelta(hours=1)
-    db.commit()
     reset_url = f"http://localhost:8000/auth/reset-password?token={token}"
     html_body = render_template(
         "password_reset_email.html",
@@ -209,12 +210,14 @@ def request_password_reset(email: str, db: Session = Depends(get_db)):
         email=user.email,
         reset_url=reset_url,
     )
-    send_email(
+    enqueue_email(
+        db,
         user.email,
         "Password Reset",
         f"Reset your password: {reset_url}",
         html_body=html_body,
     )
+    db.commit()
     return {"message": "If the email exists, a reset link will be sent."}
 
 
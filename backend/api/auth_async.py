@@ -0,0 +1,134 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user import User
+from schemas.user import UserCreate, UserLogin, Token
+from core.security import (
+    get_password_hash,
+    verify_password,
+    create_access_token,
+    create_refresh_token,
+)
+from core.database import get_async_db
+from core.email_utils import render_template
+from core.outbox import enqueue_email
+from api.auth import (
+    check_rate_limit,
+    is_strong_password,
+    register_attempts,
+    login_attempts,
+)
+import pyotp
+import secrets
+
+# Async counterparts of register/login in api/auth.py; swapped in place of the
+# sync routes when DB_ASYNC is enabled. bcrypt is CPU bound, so hashing still
+# runs in the threadpool.
+async_auth_router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+def _set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    response.set_cookie(
+        key="access_token", value=access_token, httponly=True, secure=True
+    )
+    response.set_cookie(
+        key="refresh_token", value=refresh_token, httponly=True, secure=True
+    )
+
+
+@async_auth_router.post("/register", response_model=Token)
+async def register(
+    user: UserCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    response: Response = None,
+):
+    ip = request.client.host if request else "unknown"
+    if not check_rate_limit(ip, register_attempts):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many registration attempts. Please try again later.",
+        )
+    if not is_strong_password(user.password):
+        raise HTTPException(
+            status_code=400,
+            detail="Password too weak. Must be 8+ chars, include upper/lowercase, digit, special char.",
+        )
+    result = await db.execute(select(User).where(User.email == user.email))
+    if result.scalars().first():
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
+    verification_token = secrets.token_urlsafe(32)
+    new_user = User(
+        email=user.email,
+        hashed_password=hashed_password,
+        full_name=user.full_name,
+        verification_token=verification_token,
+        email_verified=False,
+    )
+    db.add(new_user)
+    verify_url = f"http://localhost:8000/auth/verify-email?token={verification_token}"
+    html_body = render_template(
+        "verification_email.html",
+        full_name=new_user.full_name,
+        email=new_user.email,
+        verify_url=verify_url,
+    )
+    enqueue_email(
+        db,
+        new_user.email,
+        "Verify your email",
+        f"Verify your email: {verify_url}",
+        html_body=html_body,
+    )
+    await db.commit()
+    access_token = create_access_token(data={"sub": new_user.email})
+    refresh_token = create_refresh_token(data={"sub": new_user.email})
+    if response:
+        _set_auth_cookies(response, access_token, refresh_token)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@async_auth_router.post("/login", response_model=Token)
+async def login(
+    user: UserLogin,
+    db: AsyncSession = Depends(get_async_db),
+    request: Request = None,
+    response: Response = None,
+    otp_token: str = None,
+):
+    ip = request.client.host if request else "unknown"
+    if not check_rate_limit(ip, login_attempts):
+        raise HTTPException(
+            status_code=429, detail="Too many login attempts. Please try again later."
+        )
+    result = await db.execute(
+        select(User).where(User.email == user.email, User.is_deleted == False)
+    )
+    db_user = result.scalars().first()
+    if not db_user or not await run_in_threadpool(
+        verify_password, user.password, db_user.hashed_password
+    ):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not db_user.email_verified:
+        raise HTTPException(status_code=403, detail="Email not verified")
+    if db_user.otp_secret:
+        if not otp_token:
+            raise HTTPException(status_code=401, detail="2FA token required")
+        totp = pyotp.TOTP(db_user.otp_secret)
+        if not totp.verify(otp_token):
+            raise HTTPException(status_code=401, detail="Invalid 2FA token")
+    access_token = create_access_token(data={"sub": db_user.email})
+    refresh_token = create_refresh_token(data={"sub": db_user.email})
+    if response:
+        _set_auth_cookies(response, access_token, refresh_token)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
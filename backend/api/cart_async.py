@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models.cart import Cart, CartItem
+from models.user import User
+from schemas.cart import CartItemBase, CartOut
+from core.security import get_current_user_async
+from core.database import get_async_db
+from datetime import datetime
+
+# Async counterparts of api/cart.py; swapped in place of the sync routes when
+# DB_ASYNC is enabled.
+async_cart_router = APIRouter(prefix="/cart", tags=["cart"])
+
+
+async def _load_cart(db: AsyncSession, user_id: int):
+    # cart.items must be eager-loaded: lazy loads are not allowed under asyncio
+    result = await db.execute(
+        select(Cart)
+        .where(Cart.user_id == user_id)
+        .options(selectinload(Cart.items))
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def _get_or_create_cart(db: AsyncSession, user_id: int):
+    cart = await _load_cart(db, user_id)
+    if not cart:
+        db.add(Cart(user_id=user_id, created_at=datetime.utcnow()))
+        await db.commit()
+        cart = await _load_cart(db, user_id)
+    return cart
+
+
+async def _get_cart_item(db: AsyncSession, cart_id: int, product_id: int):
+    result = await db.execute(
+        select(CartItem).where(
+            CartItem.cart_id == cart_id, CartItem.product_id == product_id
+        )
+    )
+    return result.scalars().first()
+
+
+@async_cart_router.get("/", response_model=CartOut)
+async def get_cart(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    return await _get_or_create_cart(db, user.id)
+
+
+@async_cart_router.post("/add", response_model=CartOut)
+async def add_to_cart(
+    item: CartItemBase,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    cart = await _get_or_create_cart(db, user.id)
+    cart_item = await _get_cart_item(db, cart.id, item.product_id)
+    if cart_item:
+        cart_item.quantity += item.quantity
+    else:
+        db.add(
+            CartItem(cart_id=cart.id, product_id=item.product_id, quantity=item.quantity)
+        )
+    await db.commit()
+    return await _load_cart(db, user.id)
+
+
+@async_cart_router.post("/remove", response_model=CartOut)
+async def remove_from_cart(
+    item: CartItemBase,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    cart = await _load_cart(db, user.id)
+    if not cart:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    cart_item = await _get_cart_item(db, cart.id, item.product_id)
+    if not cart_item:
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    await db.delete(cart_item)
+    await db.commit()
+    return await _load_cart(db, user.id)
+
+
+@async_cart_router.post("/update", response_model=CartOut)
+async def update_cart_item(
+    item: CartItemBase,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    cart = await _load_cart(db, user.id)
+    if not cart:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    cart_item = await _get_cart_item(db, cart.id, item.product_id)
+    if not cart_item:
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    cart_item.quantity = item.quantity
+    await db.commit()
+    return await _load_cart(db, user.id)
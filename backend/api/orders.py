@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from models.order import Order
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.orm import Session, selectinload
+from models.order import Order, OrderItem
 from models.cart import Cart, CartItem
 from models.product import Product
 from models.user import User
@@ -9,33 +9,73 @@ from schemas.order import OrderOut, OrderHistory, OrderFilter
 from core.security import get_current_user, require_role
 from core.database import get_db
 from datetime import datetime
-from typing import List
-from core.email_utils import send_email, render_template
-from core.pagination import paginate_query, get_pagination_params, PaginatedResponse
-from sqlalchemy import and_
+from typing import List, Optional
+from core.email_utils import render_template
+from core.outbox import enqueue_email
+from core.pagination import (
+    paginate_query,
+    paginate_keyset,
+    get_pagination_params,
+    PaginatedResponse,
+    CursorPage,
+    CountStrategy,
+)
+from core.streaming import export_response, ExportFormat
+from core.fastjson import FAST_JSON, RowSerializer, json_response, page_envelope
+from core.inventory import apply_stock_changes
+from core.idempotency import idempotent
+from sqlalchemy import and_, insert, select
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
-@router.post("/place", response_model=OrderOut)
-def place_order(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def checkout_cart(db: Session, user: User):
+    """Turn the user's cart into a pending order; returns (order, email items).
+
+    Cart products load in one IN query (row-locked in id order where the
+    database supports it) and stock is reserved with guarded set-based
+    UPDATEs, so concurrent checkouts cannot oversell. The reservation, the
+    order with its line items (one bulk INSERT), the emptied cart and the
+    queued confirmation email commit together; any shortfall rolls back.
+    """
     cart = db.query(Cart).filter(Cart.user_id == user.id).first()
     if not cart or not cart.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
-    total = 0
-    items = []
+    quantities = {}
+    for item in cart.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    products = {
+        product.id: product
+        for product in db.query(Product)
+        .filter(Product.id.in_(quantities), Product.is_deleted == False)
+        .order_by(Product.id)
+        .with_for_update()
+    }
+    unavailable = [pid for pid in quantities if pid not in products]
+    if not unavailable:
+        _, unavailable = apply_stock_changes(
+            db, {pid: (None, -quantity) for pid, quantity in quantities.items()}
+        )
+    if unavailable:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Product {unavailable[0]} unavailable or out of stock",
+        )
+    lines = {}  # product_id -> line item values, in cart order
     for item in cart.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if not product or product.stock < item.quantity:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Product {item.product_id} unavailable or out of stock",
-            )
-        total += product.price * item.quantity
-        product.stock -= item.quantity
-        items.append(
-            {"name": product.name, "quantity": item.quantity, "price": product.price}
+        product = products[item.product_id]
+        line = lines.setdefault(
+            product.id,
+            {
+                "product_id": product.id,
+                "product_name": product.name,
+                "quantity": 0,
+                "price": product.price,
+            },
         )
+        line["quantity"] += item.quantity
+    total = sum(line["price"] * line["quantity"] for line in lines.values())
     order = Order(
         user_id=user.id,
         total_amount=total,
@@ -43,54 +83,112 @@ def place_order(db: Session = Depends(get_db), user: User = Depends(get_current_
         created_at=datetime.utcnow(),
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
-    # Optionally clear cart
+    db.flush()
+    order_id = order.id
+    db.execute(
+        insert(OrderItem), [{**line, "order_id": order_id} for line in lines.values()]
+    )
     for item in cart.items:
         db.delete(item)
-    db.commit()
-    # Send order confirmation email
+    items = [
+        {"name": line["product_name"], "quantity": line["quantity"], "price": line["price"]}
+        for line in lines.values()
+    ]
     html_body = render_template(
         "order_confirmation_email.html",
         full_name=user.full_name,
-        order_id=order.id,
+        order_id=order_id,
         items=items,
         total=total,
     )
-    send_email(
+    enqueue_email(
+        db,
         str(user.email),
         "Order Confirmation",
-        f"Your order #{order.id} has been placed.",
+        f"Your order #{order_id} has been placed.",
         html_body=html_body,
     )
-    return order
+    db.commit()
+    order = (
+        db.query(Order)
+        .options(selectinload(Order.items))
+        .filter(Order.id == order_id)
+        .one()
+    )
+    return order, items
+
+
+@router.post("/place", response_model=OrderOut)
+def place_order(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    # Retries carrying the same Idempotency-Key replay the first order
+    return idempotent(
+        db,
+        idempotency_key,
+        user.id,
+        request,
+        lambda: OrderOut.model_validate(checkout_cart(db, user)[0], from_attributes=True),
+    )
+
+
+ORDER_ROWS = RowSerializer(OrderOut)
+ORDER_HISTORY_ROWS = RowSerializer(OrderHistory)
+
+
+def order_rows_query(user: User):
+    """list_orders as column rows labelled like OrderOut"""
+    return select(*ORDER_ROWS.columns(Order)).where(
+        Order.user_id == user.id, Order.is_deleted == False
+    )
+
+
+def order_items_query(order_rows):
+    """Line items of the given order rows, in Order.items order"""
+    return (
+        select(
+            OrderItem.order_id,
+            OrderItem.product_id,
+            OrderItem.product_name,
+            OrderItem.quantity,
+            OrderItem.price,
+        )
+        .where(OrderItem.order_id.in_([row.id for row in order_rows]))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+
+
+def encode_order_rows(order_rows, item_rows) -> List[dict]:
+    items = {row.id: [] for row in order_rows}
+    for order_id, product_id, product_name, quantity, price in item_rows:
+        items[order_id].append(
+            {
+                "product_id": product_id,
+                "product_name": product_name,
+                "quantity": quantity,
+                "price": price,
+                "total": price * quantity,
+            }
+        )
+    return ORDER_ROWS.validate(order_rows, {"items": list(items.values())})
 
 
 @router.get("/", response_model=List[OrderOut])
 def list_orders(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if FAST_JSON:
+        rows = db.execute(order_rows_query(user)).all()
+        return json_response(encode_order_rows(rows, db.execute(order_items_query(rows))))
     return (
         db.query(Order)
+        .options(selectinload(Order.items))
         .filter(Order.user_id == user.id, Order.is_deleted == False)
         .all()
     )
 
 
-@router.get("/{order_id}", response_model=OrderOut)
-def get_order(
-    order_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
-):
-    order = (
-        db.query(Order)
-        .filter(
-            Order.id == order_id, Order.user_id == user.id, Order.is_deleted == False
-        )
-        .first()
-    )
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return order
-
-
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_order(
     order_id: int, db: Session = Depends(get_db), user=Depends(require_role("admin"))
@@ -120,7 +218,36 @@ def delete_order(
     "/all", response_model=List[OrderOut], dependencies=[Depends(require_role("admin"))]
 )
 def list_all_orders(db: Session = Depends(get_db)):
-    return db.query(Order).filter(Order.is_deleted == False).all()
+    return (
+        db.query(Order)
+        .options(selectinload(Order.items))
+        .filter(Order.is_deleted == False)
+        .all()
+    )
+
+
+ORDER_EXPORT_COLUMNS = [
+    "id",
+    "user_id",
+    "total_amount",
+    "status",
+    "shipping_address_id",
+    "created_at",
+]
+
+
+@router.get("/all/export", dependencies=[Depends(require_role("admin"))])
+def export_all_orders(format: ExportFormat = "ndjson", gzip: bool = False):
+    """Stream every order as NDJSON or CSV"""
+    return export_response(
+        lambda db: db.query(*[getattr(Order, c) for c in ORDER_EXPORT_COLUMNS])
+        .filter(Order.is_deleted == False)
+        .order_by(Order.id),
+        ORDER_EXPORT_COLUMNS,
+        "orders",
+        format,
+        gzip,
+    )
 
 
 @router.patch(
@@ -141,9 +268,7 @@ def update_order_status(order_id: int, status: str, db: Session = Depends(get_db
         )
     # Set status on the order instance
     setattr(order, "status", status)
-    db.commit()
-    db.refresh(order)
-    # Send order status update email
+    # Queue the order status update email with the change
     user = db.query(User).filter(User.id == order.user_id).first()
     if user is not None:
         html_body = render_template(
@@ -153,23 +278,19 @@ def update_order_status(order_id: int, status: str, db: Session = Depends(get_db
             status=status,
             tracking_url=None,
         )
-        send_email(
+        enqueue_email(
+            db,
             str(user.email),
             "Order Status Update",
             f"Order #{order.id} status updated to {status}.",
             html_body=html_body,
         )
+    db.commit()
+    db.refresh(order)
     return order
 
 
-@router.get("/history", response_model=PaginatedResponse[OrderHistory])
-def get_order_history(
-    filter: OrderFilter = Depends(),
-    page: int = 1,
-    size: int = 20,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
-):
+def _order_history_query(db: Session, user: User, filter: OrderFilter):
     query = db.query(Order).filter(Order.user_id == user.id, Order.is_deleted == False)
 
     # Apply filters
@@ -188,7 +309,63 @@ def get_order_history(
     if filter.max_amount:
         query = query.filter(Order.total_amount <= filter.max_amount)
 
+    return query
+
+
+@router.get("/history", response_model=PaginatedResponse[OrderHistory])
+def get_order_history(
+    filter: OrderFilter = Depends(),
+    page: int = 1,
+    size: int = 20,
+    count: CountStrategy = "exact",
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    query = _order_history_query(db, user, filter)
+
     # Order by most recent first
     query = query.order_by(Order.created_at.desc())
 
-    return paginate_query(query, page, size)
+    if FAST_JSON:
+        query = query.with_entities(*ORDER_HISTORY_ROWS.columns(Order))
+        result = paginate_query(query, page, size, count)
+        return json_response(
+            page_envelope(result, ORDER_HISTORY_ROWS.validate(result.items))
+        )
+    return paginate_query(query, page, size, count)
+
+
+@router.get("/history/cursor", response_model=CursorPage[OrderHistory])
+def get_order_history_cursor(
+    filter: OrderFilter = Depends(),
+    cursor: Optional[str] = None,
+    size: int = 20,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Keyset-paginated order history, most recent first"""
+    return paginate_keyset(
+        _order_history_query(db, user, filter),
+        Order.created_at,
+        Order.id,
+        descending=True,
+        cursor=cursor,
+        size=size,
+    )
+
+
+@router.get("/{order_id}", response_model=OrderOut)
+def get_order(
+    order_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+):
+    order = (
+        db.query(Order)
+        .options(selectinload(Order.items))
+        .filter(
+            Order.id == order_id, Order.user_id == user.id, Order.is_deleted == False
+        )
+        .first()
+    )
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
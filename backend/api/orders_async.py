@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.order import Order
+from models.user import User
+from schemas.order import OrderOut
+from core.security import get_current_user_async
+from core.database import get_async_db
+from core.fastjson import FAST_JSON, json_response
+from core.idempotency import idempotent_async
+from api.orders import checkout_cart, order_rows_query, order_items_query, encode_order_rows
+from typing import List, Optional
+
+# Async counterparts of the customer order routes in api/orders.py; swapped in
+# place of the sync routes when DB_ASYNC is enabled.
+async_orders_router = APIRouter(prefix="/orders", tags=["orders"])
+
+
+@async_orders_router.post("/place", response_model=OrderOut)
+async def place_order(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    # The checkout transaction (including the queued confirmation email) is
+    # shared with the sync handler; run_sync drives it over the async
+    # connection, so no worker thread is held meanwhile.
+    async def checkout():
+        order, _ = await db.run_sync(checkout_cart, user)
+        return OrderOut.model_validate(order, from_attributes=True)
+
+    return await idempotent_async(db, idempotency_key, user.id, request, checkout)
+
+
+@async_orders_router.get("/", response_model=List[OrderOut])
+async def list_orders(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    if FAST_JSON:
+        rows = (await db.execute(order_rows_query(user))).all()
+        item_rows = await db.execute(order_items_query(rows))
+        return json_response(encode_order_rows(rows, item_rows))
+    result = await db.execute(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.user_id == user.id, Order.is_deleted == False)
+    )
+    return result.scalars().all()
+
+
+@async_orders_router.get("/{order_id}", response_model=OrderOut)
+async def get_order(
+    order_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    result = await db.execute(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(
+            Order.id == order_id, Order.user_id == user.id, Order.is_deleted == False
+        )
+    )
+    order = result.scalars().first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
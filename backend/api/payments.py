@@ -9,8 +9,11 @@ import stripe
 import paypalrestsdk
 import os
 import requests
-from core.email_utils import send_email, render_template
+from core.email_utils import render_template
+from core.outbox import enqueue_email
+from core.idempotency import idempotent
 from datetime import datetime
+from typing import Optional
 
 payment_router = APIRouter(prefix="/payments", tags=["payments"])
 
@@ -24,13 +27,7 @@ paypalrestsdk.configure(
 )
 
 
-@payment_router.post("/stripe/{order_id}")
-def pay_with_stripe(
-    order_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
-    idempotency_key: str = Header(None),
-):
+def create_stripe_intent(db: Session, user: User, order_id: int, idempotency_key: Optional[str]):
     order = (
         db.query(Order).filter(Order.id == order_id, Order.user_id == user.id).first()
     )
@@ -44,14 +41,33 @@ def pay_with_stripe(
         "metadata": {"order_id": order.id, "user_id": user.id},
     }
     if idempotency_key:
+        # Also passed on (scoped to the user), so a retry after a failure
+        # between Stripe and our response gets the same intent back
         intent = stripe.PaymentIntent.create(
-            **stripe_args, idempotency_key=idempotency_key
+            **stripe_args, idempotency_key=f"{user.id}:{idempotency_key}"
         )
     else:
         intent = stripe.PaymentIntent.create(**stripe_args)
     return {"client_secret": intent.client_secret}
 
 
+@payment_router.post("/stripe/{order_id}")
+def pay_with_stripe(
+    order_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None),
+):
+    return idempotent(
+        db,
+        idempotency_key,
+        user.id,
+        request,
+        lambda: create_stripe_intent(db, user, order_id, idempotency_key),
+    )
+
+
 @payment_router.post("/stripe/confirm/{order_id}")
 def confirm_stripe_payment(
     order_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
@@ -63,10 +79,7 @@ def confirm_stripe_payment(
     }
 
 
-@payment_router.post("/paypal/{order_id}")
-def pay_with_paypal(
-    order_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
-):
+def create_paypal_payment(db: Session, user: User, order_id: int):
     order = (
         db.query(Order).filter(Order.id == order_id, Order.user_id == user.id).first()
     )
@@ -108,6 +121,23 @@ def pay_with_paypal(
         raise HTTPException(status_code=500, detail="PayPal payment creation failed")
 
 
+@payment_router.post("/paypal/{order_id}")
+def pay_with_paypal(
+    order_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None),
+):
+    return idempotent(
+        db,
+        idempotency_key,
+        user.id,
+        request,
+        lambda: create_paypal_payment(db, user, order_id),
+    )
+
+
 @payment_router.get("/paypal/confirm/{order_id}")
 def confirm_paypal_payment(
     order_id: int,
@@ -149,8 +179,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
                 raw_response=intent,
             )
             db.add(txn)
-            db.commit()
-            # Send payment receipt email
+            # Queue the payment receipt email with the payment
             user = db.query(User).filter(User.id == order.user_id).first()
             html_body = render_template(
                 "payment_receipt_email.html",
@@ -160,12 +189,14 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
                 payment_method="Stripe",
                 date=str(datetime.utcnow()),
             )
-            send_email(
+            enqueue_email(
+                db,
                 str(user.email),
                 "Payment Receipt",
                 f"Payment received for order #{order.id}.",
                 html_body=html_body,
             )
+            db.commit()
     return {"status": "ok"}
 
 
@@ -213,8 +244,7 @@ async def paypal_webhook(request: Request, db: Session = Depends(get_db)):
                 raw_response=resource,
             )
             db.add(txn)
-            db.commit()
-            # Send payment receipt email
+            # Queue the payment receipt email with the payment
             user = db.query(User).filter(User.id == order.user_id).first()
             html_body = render_template(
                 "payment_receipt_email.html",
@@ -224,10 +254,12 @@ async def paypal_webhook(request: Request, db: Session = Depends(get_db)):
                 payment_method="PayPal",
                 date=str(datetime.utcnow()),
             )
-            send_email(
+            enqueue_email(
+                db,
                 str(user.email),
                 "Payment Receipt",
                 f"Payment received for order #{order.id}.",
                 html_body=html_body,
             )
+            db.commit()
     return {"status": "ok"}
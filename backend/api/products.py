@@ -1,50 +1,153 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    UploadFile,
+    File,
+    Query,
+    Request,
+    Response,
+)
 from sqlalchemy.orm import Session
-from models.product import Product
+from models.product import Product, ProductTag, LowStockProduct, normalize_tag
 from schemas.product import (
     ProductCreate,
     ProductUpdate,
     ProductOut,
     ProductSearch,
+    ProductSuggestion,
     ProductFilter,
+    ProductImportResult,
+    StockAdjustment,
+    StockLevel,
+    RejectedStockAdjustment,
+    BulkStockResult,
 )
 from core.security import require_role
 from core.database import get_db
 from datetime import datetime
 from models.audit import AuditLog
-from typing import List
-from fastapi.responses import FileResponse
+from typing import List, Optional
+from fastapi.responses import FileResponse, StreamingResponse
 import os
-from core.pagination import paginate_query, get_pagination_params, PaginatedResponse
-from sqlalchemy import or_, and_
+import orjson
+from core.pagination import (
+    paginate_query,
+    paginate_keyset,
+    get_pagination_params,
+    PaginatedResponse,
+    FacetedPage,
+    CursorPage,
+    CountStrategy,
+)
+from core.streaming import export_response, ExportFormat
+from core.search import apply_search
+from core.cache import product_cache
+from core.conditional import conditional_response, make_etag
+from core.fastjson import FAST_JSON, RowSerializer, json_response
+from core.images import save_upload, verify_image, schedule_derivatives, UploadLimitRoute
+from core.product_import import import_products, detect_format, ImportFormat
+from core.inventory import collapse_adjustments, apply_stock_changes, current_stock
+from core.facets import facet_counts
+from core.suggest import suggest_index, SUGGEST_LIMIT, SUGGEST_MAX_LIMIT
+from core.views import view_counter
+from core.stock_alerts import stock_alerts, LOW_STOCK_THRESHOLD
+from sqlalchemy import or_, and_, func, select
 
 product_router = APIRouter(prefix="/products", tags=["products"])
+# Upload routes, included into product_router below their definitions
+image_upload_router = APIRouter(route_class=UploadLimitRoute)
 
 STATIC_IMAGE_DIR = os.path.join(os.path.dirname(__file__), "../static/images")
 os.makedirs(STATIC_IMAGE_DIR, exist_ok=True)
+ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
 
 
-@product_router.get("/", response_model=List[ProductOut])
-def list_products(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+def collection_version(db: Session):
+    """(latest updated_at, row count) of the catalog; changes on every write.
+
+    Soft deletes bump updated_at and hard deletes change the count.
+    """
+    cached = product_cache.get(("collection",))
+    if cached is not None:
+        return cached
+    generation = product_cache.snapshot()
+    version = tuple(db.query(func.max(Product.updated_at), func.count(Product.id)).one())
+    product_cache.set(("collection",), version, [], generation, db)
+    return version
+
+
+def product_etag(product: ProductOut) -> str:
+    return make_etag("product", product.id, product.updated_at or product.created_at)
+
+
+PRODUCT_ROWS = RowSerializer(ProductOut)
+
+
+def product_rows_query(skip: int, limit: int):
+    """A list_products page as column rows labelled like ProductOut"""
     return (
-        db.query(Product)
-        .filter(Product.is_deleted == False)
+        select(*PRODUCT_ROWS.columns(Product))
+        .where(Product.is_deleted == False)
         .offset(skip)
         .limit(limit)
-        .all()
     )
 
 
-@product_router.get("/{product_id}", response_model=ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = (
-        db.query(Product)
-        .filter(Product.id == product_id, Product.is_deleted == False)
-        .first()
+def product_tags_query(product_ids: List[int]):
+    return (
+        select(ProductTag.product_id, ProductTag.tag)
+        .where(ProductTag.product_id.in_(product_ids))
+        .order_by(ProductTag.product_id, ProductTag.tag)
     )
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+
+
+def encode_product_rows(rows, tag_rows) -> bytes:
+    """JSON bytes of List[ProductOut] built from column rows and tag rows"""
+    tags = {}
+    for product_id, tag in tag_rows:
+        tags.setdefault(product_id, []).append(tag)
+    return orjson.dumps(
+        PRODUCT_ROWS.validate(rows, {"tags": [tags.get(row.id, []) for row in rows]})
+    )
+
+
+@product_router.get("/", response_model=List[ProductOut])
+def list_products(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+):
+    version = collection_version(db)
+    not_modified = conditional_response(
+        request, response, make_etag("list", *version, skip, limit), version[0]
+    )
+    if not_modified:
+        return not_modified
+    key = ("list", skip, limit)
+    cached = product_cache.get(key)
+    if cached is not None:
+        return json_response(cached, response.headers) if FAST_JSON else cached
+    generation = product_cache.snapshot()
+    if FAST_JSON:
+        rows = db.execute(product_rows_query(skip, limit)).all()
+        tag_rows = db.execute(product_tags_query([row.id for row in rows])).all()
+        body = encode_product_rows(rows, tag_rows)
+        product_cache.set(key, body, [row.id for row in rows], generation, db)
+        return json_response(body, response.headers)
+    products = [
+        ProductOut.model_validate(p)
+        for p in db.query(Product)
+        .filter(Product.is_deleted == False)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    ]
+    product_cache.set(key, products, [p.id for p in products], generation, db)
+    return products
 
 
 @product_router.post(
@@ -129,7 +232,7 @@ def delete_product(
     return None
 
 
-@product_router.post(
+@image_upload_router.post(
     "/{product_id}/upload-image",
     response_model=ProductOut,
     dependencies=[Depends(require_role("admin"))],
@@ -144,17 +247,24 @@ def upload_product_image(
     )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    ext = os.path.splitext(file.filename)[1]
-    filename = f"product_{product_id}{ext}"
-    file_path = os.path.join(STATIC_IMAGE_DIR, filename)
-    with open(file_path, "wb") as image_file:
-        image_file.write(file.file.read())
-    product.image_url = f"/static/images/{filename}"
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    digest, original_path = save_upload(file.file, ext)
+    verify_image(original_path)
+    # Derivatives are rendered in the background; image_variants stays empty
+    # (and image_url unchanged) until they are ready.
+    product.image_hash = digest
+    product.image_variants = None
     db.commit()
     db.refresh(product)
+    schedule_derivatives(product.id, original_path, digest)
     return product
 
 
+product_router.include_router(image_upload_router)
+
+
 @product_router.get("/images/{filename}")
 def get_product_image(filename: str):
     file_path = os.path.join(STATIC_IMAGE_DIR, filename)
@@ -172,6 +282,42 @@ def list_inventory(db: Session = Depends(get_db)):
     return db.query(Product).filter(Product.is_deleted == False).all()
 
 
+INVENTORY_EXPORT_COLUMNS = ["id", "name", "price", "stock", "image_url", "created_at"]
+
+
+@product_router.get("/inventory/export", dependencies=[Depends(require_role("admin"))])
+def export_inventory(format: ExportFormat = "ndjson", gzip: bool = False):
+    """Stream the full inventory as NDJSON or CSV"""
+    return export_response(
+        lambda db: db.query(
+            *[getattr(Product, c) for c in INVENTORY_EXPORT_COLUMNS]
+        )
+        .filter(Product.is_deleted == False)
+        .order_by(Product.id),
+        INVENTORY_EXPORT_COLUMNS,
+        "inventory",
+        format,
+        gzip,
+    )
+
+
+@product_router.post("/import", response_model=ProductImportResult)
+def bulk_import_products(
+    file: UploadFile = File(...),
+    format: Optional[ImportFormat] = None,
+    db: Session = Depends(get_db),
+    user=Depends(require_role("admin")),
+):
+    """Upsert products by sku from a CSV or NDJSON file, in batches.
+
+    Invalid rows are skipped and reported; valid rows are committed batch by
+    batch with one audit record each.
+    """
+    return import_products(
+        db, file.file, format or detect_format(file.filename), user_id=user.id
+    )
+
+
 @product_router.patch(
     "/{product_id}/stock",
     response_model=ProductOut,
@@ -193,12 +339,68 @@ def update_product_stock(product_id: int, stock: int, db: Session = Depends(get_
     return product
 
 
+BULK_STOCK_MAX_ITEMS = 10000
+
+
+@product_router.patch("/stock", response_model=BulkStockResult)
+def bulk_adjust_stock(
+    adjustments: List[StockAdjustment],
+    db: Session = Depends(get_db),
+    user=Depends(require_role("admin")),
+):
+    """Apply many stock deltas/absolute values in one transaction.
+
+    Adjustments for the same product apply in order. Products whose stock
+    would go negative, and unknown products, are rejected; the rest commit.
+    """
+    if len(adjustments) > BULK_STOCK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BULK_STOCK_MAX_ITEMS} adjustments per request"
+        )
+    changes = collapse_adjustments(adjustments)
+    updated, rejected_ids = apply_stock_changes(db, changes)
+    existing = current_stock(db, rejected_ids)
+    rejected = [
+        RejectedStockAdjustment(
+            product_id=pid, reason="Stock cannot be negative", stock=existing[pid]
+        )
+        if pid in existing
+        else RejectedStockAdjustment(product_id=pid, reason="Product not found")
+        for pid in rejected_ids
+    ]
+    db.add(
+        AuditLog(
+            user_id=user.id,
+            action="bulk_stock_adjust",
+            target_type="product",
+            details={
+                "requested": len(adjustments),
+                "updated": len(updated),
+                "rejected": rejected_ids,
+            },
+        )
+    )
+    db.commit()
+    return BulkStockResult(
+        updated=[StockLevel(product_id=pid, stock=stock) for pid, stock in updated.items()],
+        rejected=rejected,
+    )
+
+
 @product_router.get(
     "/low-stock",
     response_model=List[ProductOut],
     dependencies=[Depends(require_role("admin"))],
 )
 def list_low_stock_products(threshold: int = 5, db: Session = Depends(get_db)):
+    if threshold < LOW_STOCK_THRESHOLD:
+        # Served from the maintained low-stock set
+        return (
+            db.query(Product)
+            .join(LowStockProduct, LowStockProduct.product_id == Product.id)
+            .filter(LowStockProduct.stock <= threshold)
+            .all()
+        )
     return (
         db.query(Product)
         .filter(Product.stock <= threshold, Product.is_deleted == False)
@@ -206,22 +408,52 @@ def list_low_stock_products(threshold: int = 5, db: Session = Depends(get_db)):
     )
 
 
-@product_router.get("/search", response_model=PaginatedResponse[ProductOut])
-def search_products(
-    search: ProductSearch = Depends(),
-    filter: ProductFilter = Depends(),
-    page: int = 1,
-    size: int = 20,
-    db: Session = Depends(get_db),
-):
+@product_router.get(
+    "/low-stock/events",
+    dependencies=[Depends(require_role("admin"))],
+)
+async def low_stock_events(request: Request):
+    """Server-sent events for low-stock threshold crossings"""
+    return StreamingResponse(
+        stock_alerts.sse_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+def product_filter(
+    category: Optional[str] = None,
+    brand: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+) -> ProductFilter:
+    """ProductFilter from query parameters (tags may repeat: ?tags=a&tags=b)"""
+    return ProductFilter(category=category, brand=brand, tags=tags)
+
+
+def _apply_facet_filters(query, filter: ProductFilter):
+    if filter.category:
+        query = query.filter(Product.category == filter.category)
+    if filter.brand:
+        query = query.filter(Product.brand == filter.brand)
+    if filter.tags:
+        # Products carrying every requested tag
+        tags = {normalize_tag(t) for t in filter.tags}
+        tagged = (
+            select(ProductTag.product_id)
+            .where(ProductTag.tag.in_(tags))
+            .group_by(ProductTag.product_id)
+            .having(func.count() == len(tags))
+        )
+        query = query.filter(Product.id.in_(tagged))
+    return query
+
+
+def _search_query(db: Session, search: ProductSearch, rank: bool = False):
     query = db.query(Product).filter(Product.is_deleted == False)
 
-    # Search by query
+    # Full-text search (ordered by relevance when rank is set)
     if search.query:
-        search_term = f"%{search.query}%"
-        query = query.filter(
-            or_(Product.name.ilike(search_term), Product.description.ilike(search_term))
-        )
+        query = apply_search(query, Product, search.query, rank=rank)
 
     # Price filtering
     if search.min_price is not None:
@@ -236,29 +468,116 @@ def search_products(
         else:
             query = query.filter(Product.stock == 0)
 
+    return query
+
+
+@product_router.get("/suggest", response_model=List[ProductSuggestion])
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT),
+):
+    """Search-as-you-type: most popular products whose name has a word
+    starting with the last word of q (earlier words must match whole words).
+
+    Served from the in-memory index in core.suggest, without a database query.
+    """
+    if not suggest_index.ready:
+        raise HTTPException(status_code=503, detail="Suggestions are not available yet")
+    return [
+        {"id": product_id, "name": name}
+        for product_id, name in suggest_index.suggest(q, limit)
+    ]
+
+
+@product_router.get("/search", response_model=PaginatedResponse[ProductOut])
+def search_products(
+    request: Request,
+    response: Response,
+    search: ProductSearch = Depends(),
+    filter: ProductFilter = Depends(product_filter),
+    page: int = 1,
+    size: int = 20,
+    count: CountStrategy = "exact",
+    db: Session = Depends(get_db),
+):
+    version = collection_version(db)
+    etag = make_etag("search", *version, sorted(request.query_params.multi_items()))
+    not_modified = conditional_response(request, response, etag, version[0])
+    if not_modified:
+        return not_modified
+
+    # Without an explicit sort, text searches are ordered by relevance
+    ranked = bool(search.query) and not search.sort_by
+    query = _apply_facet_filters(_search_query(db, search, rank=ranked), filter)
+
     # Sorting
     if search.sort_by:
         sort_column = getattr(Product, search.sort_by)
         if search.sort_order == "desc":
             sort_column = sort_column.desc()
         query = query.order_by(sort_column)
-    else:
+    elif not ranked:
         query = query.order_by(Product.created_at.desc())
 
-    return paginate_query(query, page, size)
+    return paginate_query(query, page, size, count)
+
 
+@product_router.get("/search/cursor", response_model=CursorPage[ProductOut])
+def search_products_cursor(
+    search: ProductSearch = Depends(),
+    cursor: Optional[str] = None,
+    size: int = 20,
+    db: Session = Depends(get_db),
+):
+    """Keyset-paginated search; pass next_cursor/prev_cursor back as cursor"""
+    if search.sort_by:
+        sort_column = getattr(Product, search.sort_by)
+        descending = search.sort_order == "desc"
+    else:
+        sort_column, descending = Product.created_at, True
+    return paginate_keyset(
+        _search_query(db, search), sort_column, Product.id, descending, cursor, size
+    )
 
-@product_router.get("/filter", response_model=PaginatedResponse[ProductOut])
+
+@product_router.get("/filter", response_model=FacetedPage[ProductOut])
 def filter_products(
-    filter: ProductFilter = Depends(),
+    filter: ProductFilter = Depends(product_filter),
     page: int = 1,
     size: int = 20,
+    count: CountStrategy = "exact",
     db: Session = Depends(get_db),
 ):
-    query = db.query(Product).filter(Product.is_deleted == False)
+    """Products matching category/brand/tags, plus catalog facet counts.
 
-    # Apply filters (placeholder for category, brand, tags)
-    # These would need corresponding fields in the Product model
-    # For now, we'll return all products with pagination
+    Counts come from the maintained facet_counts table (one small SELECT).
+    """
+    query = _apply_facet_filters(
+        db.query(Product).filter(Product.is_deleted == False), filter
+    ).order_by(Product.created_at.desc(), Product.id.desc())
+    result = paginate_query(query, page, size, count)
+    return FacetedPage(**dict(result), facets=facet_counts(db))
 
-    return paginate_query(query, page, size)
+
+@product_router.get("/{product_id}", response_model=ProductOut)
+def get_product(
+    product_id: int, request: Request, response: Response, db: Session = Depends(get_db)
+):
+    key = ("product", product_id)
+    product = product_cache.get(key)
+    if product is None:
+        generation = product_cache.snapshot()
+        row = (
+            db.query(Product)
+            .filter(Product.id == product_id, Product.is_deleted == False)
+            .first()
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Product not found")
+        product = ProductOut.model_validate(row)
+        product_cache.set(key, product, [product_id], generation, db)
+    view_counter.record(product_id)
+    not_modified = conditional_response(
+        request, response, product_etag(product), product.updated_at
+    )
+    return not_modified or product
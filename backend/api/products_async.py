@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.product import Product
+from schemas.product import ProductOut
+from core.database import get_async_db
+from core.cache import product_cache
+from core.conditional import conditional_response, make_etag
+from core.fastjson import FAST_JSON, json_response
+from core.views import view_counter
+from api.products import (
+    product_etag,
+    product_rows_query,
+    product_tags_query,
+    encode_product_rows,
+)
+from typing import List
+
+# Async counterparts of the hot catalog reads in api/products.py; swapped in
+# place of the sync routes when DB_ASYNC is enabled.
+async_product_router = APIRouter(prefix="/products", tags=["products"])
+
+
+async def collection_version(db: AsyncSession):
+    cached = product_cache.get(("collection",))
+    if cached is not None:
+        return cached
+    generation = product_cache.snapshot()
+    result = await db.execute(select(func.max(Product.updated_at), func.count(Product.id)))
+    version = tuple(result.one())
+    product_cache.set(("collection",), version, [], generation, db)
+    return version
+
+
+@async_product_router.get("/", response_model=List[ProductOut])
+async def list_products(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+):
+    version = await collection_version(db)
+    not_modified = conditional_response(
+        request, response, make_etag("list", *version, skip, limit), version[0]
+    )
+    if not_modified:
+        return not_modified
+    key = ("list", skip, limit)
+    cached = product_cache.get(key)
+    if cached is not None:
+        return json_response(cached, response.headers) if FAST_JSON else cached
+    generation = product_cache.snapshot()
+    if FAST_JSON:
+        rows = (await db.execute(product_rows_query(skip, limit))).all()
+        tag_rows = (await db.execute(product_tags_query([row.id for row in rows]))).all()
+        body = encode_product_rows(rows, tag_rows)
+        product_cache.set(key, body, [row.id for row in rows], generation, db)
+        return json_response(body, response.headers)
+    result = await db.execute(
+        select(Product)
+        .where(Product.is_deleted == False)
+        .offset(skip)
+        .limit(limit)
+    )
+    products = [ProductOut.model_validate(p) for p in result.scalars().all()]
+    product_cache.set(key, products, [p.id for p in products], generation, db)
+    return products
+
+
+@async_product_router.get("/{product_id}", response_model=ProductOut)
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    key = ("product", product_id)
+    product = product_cache.get(key)
+    if product is None:
+        generation = product_cache.snapshot()
+        result = await db.execute(
+            select(Product).where(Product.id == product_id, Product.is_deleted == False)
+        )
+        row = result.scalars().first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Product not found")
+        product = ProductOut.model_validate(row)
+        product_cache.set(key, product, [product_id], generation, db)
+    view_counter.record(product_id)
+    not_modified = conditional_response(
+        request, response, product_etag(product), product.updated_at
+    )
+    return not_modified or product
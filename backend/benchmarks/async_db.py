@@ -0,0 +1,121 @@
+"""Compare sync and async database modes under concurrent load.
+
+Starts the API twice (DB_ASYNC=false / DB_ASYNC=true) against the same
+seeded SQLite file and reports requests/sec and p99 latency for
+``GET /api/v1/products/{id}`` and ``POST /api/v1/cart/add``.
+
+Usage (from backend/, needs httpx):
+    python -m benchmarks.async_db --requests 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "dshop_bench_async.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+
+import httpx  # noqa: E402
+
+
+def seed():
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    import api  # noqa: F401  (registers every mapper)
+    from core.database import SessionLocal, engine
+    from models.base import Base
+    from core.security import create_access_token
+    from models.product import Product
+    from models.user import User
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    product = Product(name="Bench product", price=9.99, stock=10**9)
+    user = User(email="bench@example.com", hashed_password="x", email_verified=True)
+    db.add_all([product, user])
+    db.commit()
+    product_id = product.id
+    db.close()
+    return product_id, create_access_token({"sub": "bench@example.com"}, None)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(client, method, url, total, concurrency, **kwargs):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, percentile(latencies, 99) * 1000
+
+
+async def bench_mode(db_async, port, product_id, token, args):
+    env = dict(os.environ, DB_ASYNC="true" if db_async else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            results = {
+                "GET /products/{id}": await run_load(
+                    client, "GET", f"/api/v1/products/{product_id}",
+                    args.requests, args.concurrency,
+                ),
+                "POST /cart/add": await run_load(
+                    client, "POST", "/api/v1/cart/add",
+                    args.requests, args.concurrency,
+                    json={"product_id": product_id, "quantity": 1},
+                    headers={"Authorization": f"Bearer {token}"},
+                ),
+            }
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    product_id, token = seed()
+    print(f"{'mode':<6} {'endpoint':<20} {'req/s':>10} {'p99 ms':>10}")
+    for db_async in (False, True):
+        results = asyncio.run(bench_mode(db_async, args.port, product_id, token, args))
+        for endpoint, (rps, p99) in results.items():
+            mode = "async" if db_async else "sync"
+            print(f"{mode:<6} {endpoint:<20} {rps:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Bulk product import throughput vs. one POST-style insert per product.
+
+Generates an NDJSON catalog, imports it with core.product_import (batched
+INSERT ... ON CONFLICT upserts), imports it a second time (all updates), and
+compares with the per-item path of POST /products/ (insert, refresh, audit
+row, two commits) on a sample.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_import --rows 100000 --sample 2000
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "dshop_bench_import.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+
+import api  # noqa: E402,F401  (registers every mapper)
+from core.database import SessionLocal, engine  # noqa: E402
+from core.product_import import import_products  # noqa: E402
+from core.search import ensure_search_index  # noqa: E402
+from models.audit import AuditLog  # noqa: E402
+from models.base import Base  # noqa: E402
+from models.product import Product  # noqa: E402
+
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+
+
+def catalog(rows: int, price: float) -> bytes:
+    return "".join(
+        json.dumps(
+            {"sku": f"SKU-{i:07d}", "name": f"Product {i}",
+             "description": "lorem ipsum " * 8, "price": price, "stock": i % 50}
+        ) + "\n"
+        for i in range(rows)
+    ).encode()
+
+
+def bulk(data: bytes) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        result = import_products(db, io.BytesIO(data), "ndjson")
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    assert result.failed == 0
+    return elapsed
+
+
+def per_item(rows: int) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for i in range(rows):
+            product = Product(sku=f"ONE-{i}", name=f"Product {i}", price=9.99, stock=1)
+            db.add(product)
+            db.commit()
+            db.refresh(product)
+            db.add(AuditLog(action="create", target_type="product", target_id=product.id))
+            db.commit()
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    reset()
+    insert_s = bulk(catalog(args.rows, 9.99))
+    update_s = bulk(catalog(args.rows, 12.50))
+    reset()
+    sample_s = per_item(args.sample)
+
+    print(f"bulk insert  {args.rows:>8} rows {insert_s:7.2f}s {args.rows / insert_s:>10.0f} rows/s")
+    print(f"bulk update  {args.rows:>8} rows {update_s:7.2f}s {args.rows / update_s:>10.0f} rows/s")
+    print(f"per item     {args.sample:>8} rows {sample_s:7.2f}s {args.sample / sample_s:>10.0f} rows/s"
+          f"  (~{args.rows * sample_s / args.sample / 60:.0f} min for {args.rows})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Concurrent checkouts against limited stock.
+
+Seeds one product with --stock units and --checkouts customers whose carts
+each hold one unit of it plus one unit of a plentiful product, then runs
+every checkout (api.orders.checkout_cart, one session each) at once from a
+thread pool. Asserts that exactly min(stock, checkouts) orders were placed,
+that stock never went negative and that every placed order reserved its
+units, then reports throughput and latency. A second round with disjoint
+carts shows the uncontended rate.
+
+Usage (from backend/):
+    python -m benchmarks.checkout_concurrency --checkouts 500 --stock 120 --threads 32
+
+Runs on a temporary SQLite database unless DATABASE_URL is set (use a
+scratch database: the tables are dropped and recreated).
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.gettempdir(), 'dshop_bench_checkout.db')}",
+)
+
+import logging  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from api.orders import checkout_cart  # noqa: E402
+from core.database import SessionLocal, engine  # noqa: E402
+from core.search import ensure_search_index  # noqa: E402
+from models.base import Base  # noqa: E402
+from models.cart import Cart, CartItem  # noqa: E402
+from models.order import Order  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.user import User  # noqa: E402
+
+PLENTY = 10**9
+
+
+def seed(checkouts: int, stock: int, contended: bool):
+    """Returns (user ids, hot product id)"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    db = SessionLocal()
+    try:
+        hot = Product(name="Limited edition", price=25.0, stock=stock)
+        plenty = [
+            Product(name=f"Staple {i}", price=2.5, stock=PLENTY) for i in range(checkouts)
+        ]
+        db.add(hot)
+        db.add_all(plenty)
+        users = [
+            User(email=f"buyer{i}@example.com", hashed_password="x", email_verified=True)
+            for i in range(checkouts)
+        ]
+        db.add_all(users)
+        db.flush()
+        for i, user in enumerate(users):
+            cart = Cart(user_id=user.id)
+            cart.items = [CartItem(product_id=plenty[i].id, quantity=1)]
+            if contended:
+                cart.items.append(CartItem(product_id=hot.id, quantity=1))
+            db.add(cart)
+        db.commit()
+        return [user.id for user in users], hot.id
+    finally:
+        db.close()
+
+
+def run(user_ids, threads: int):
+    """Check out every cart at once; returns (placed, rejected, errors,
+    latencies, wall seconds)"""
+    outcome = {"placed": 0, "rejected": 0, "errors": 0}
+    latencies = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(min(threads, len(user_ids)))
+
+    def checkout(user_id: int, wait: bool):
+        if wait:
+            start_gate.wait()
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            checkout_cart(db, db.get(User, user_id))
+            result = "placed"
+        except HTTPException:
+            result = "rejected"
+        except Exception as e:
+            logging.getLogger("ecommerce").error(f"checkout failed: {e}")
+            result = "errors"
+        finally:
+            db.close()
+        with lock:
+            outcome[result] += 1
+            latencies.append(time.perf_counter() - start)
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for i, user_id in enumerate(user_ids):
+            # The first wave starts together to maximise contention
+            pool.submit(checkout, user_id, i < threads)
+    wall = time.perf_counter() - wall
+    return outcome, latencies, wall
+
+
+def check(user_ids, hot_id: int, stock: int, outcome: dict, contended: bool):
+    db = SessionLocal()
+    try:
+        orders = db.scalar(select(func.count()).select_from(Order))
+        hot_left = db.get(Product, hot_id).stock
+        plenty_sold = db.scalar(select(func.sum(PLENTY - Product.stock)).where(Product.id != hot_id))
+        carts_left = db.scalar(select(func.count()).select_from(CartItem))
+    finally:
+        db.close()
+    expected = min(stock, len(user_ids)) if contended else len(user_ids)
+    assert outcome["errors"] == 0, f"{outcome['errors']} checkouts failed unexpectedly"
+    assert outcome["placed"] == expected, f"placed {outcome['placed']}, expected {expected}"
+    assert orders == outcome["placed"], f"{orders} orders for {outcome['placed']} checkouts"
+    assert hot_left >= 0, f"oversold: stock is {hot_left}"
+    if contended:
+        assert hot_left == stock - outcome["placed"], f"stock {hot_left} after {outcome['placed']} sales"
+    assert plenty_sold == outcome["placed"], "a rejected checkout kept its reservation"
+    assert carts_left == 2 * outcome["rejected"], "placed carts were not emptied"
+
+
+def report(label: str, outcome: dict, latencies, wall: float):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    print(
+        f"{label:<10} placed {outcome['placed']:>5}  rejected {outcome['rejected']:>5}  "
+        f"{len(latencies) / wall:8.0f} checkouts/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkouts", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=120)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+    logging.getLogger("ecommerce").setLevel(logging.WARNING)
+    print(f"{engine.dialect.name}: {args.checkouts} checkouts, {args.threads} threads")
+
+    user_ids, hot_id = seed(args.checkouts, args.stock, contended=True)
+    outcome, latencies, wall = run(user_ids, args.threads)
+    check(user_ids, hot_id, args.stock, outcome, contended=True)
+    report(f"hot ({args.stock})", outcome, latencies, wall)
+
+    user_ids, hot_id = seed(args.checkouts, args.stock, contended=False)
+    outcome, latencies, wall = run(user_ids, args.threads)
+    check(user_ids, hot_id, args.stock, outcome, contended=False)
+    report("disjoint", outcome, latencies, wall)
+    print("no oversell")
+
+
+if __name__ == "__main__":
+    main()
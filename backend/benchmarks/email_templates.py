@@ -0,0 +1,111 @@
+"""Email template load and render costs.
+
+- startup: loading every template in a fresh Environment, compiling from
+  source vs. reading the FileSystemBytecodeCache vs. the compiled modules
+  written by `python -m core.email_utils compile`
+- render: render_template per email with auto_reload on (a stat of the
+  source on every lookup, the old default) and off, and render_many for the
+  same contexts
+
+Usage (from backend/):
+    python -m benchmarks.email_templates --emails 5000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader
+
+from core import email_utils
+from core.email_utils import TEMPLATE_DIR, TEMPLATE_EXTENSIONS, render_many, render_template
+
+TEMPLATE = "order_confirmation_email.html"
+
+
+def load_all_ms(make_env, names, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        env = make_env()
+        start = time.perf_counter()
+        for name in names:
+            env.get_template(name)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def contexts(count: int):
+    return [
+        {
+            "full_name": f"Customer {i}",
+            "order_id": i,
+            "items": [{"name": f"Product {n}", "quantity": n + 1, "price": 9.99} for n in range(3)],
+            "total": 59.94,
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    source = FileSystemLoader(TEMPLATE_DIR)
+    names = [n for n in source.list_templates() if n.rsplit(".", 1)[-1] in TEMPLATE_EXTENSIONS]
+    autoescape = email_utils.template_env.autoescape
+    bytecode_dir = tempfile.mkdtemp(prefix="dshop-jinja-bench-")
+    module_dir = tempfile.mkdtemp(prefix="dshop-jinja-modules-")
+    Environment(loader=source, autoescape=autoescape).compile_templates(
+        module_dir, extensions=TEMPLATE_EXTENSIONS, zip=None
+    )
+    # Fill the bytecode cache once
+    warm = Environment(
+        loader=source, autoescape=autoescape, bytecode_cache=FileSystemBytecodeCache(bytecode_dir)
+    )
+    for name in names:
+        warm.get_template(name)
+
+    print(f"startup, load {len(names)} templates (median of {args.repeat}):")
+    compile_ms = load_all_ms(lambda: Environment(loader=source, autoescape=autoescape), names, args.repeat)
+    bytecode_ms = load_all_ms(
+        lambda: Environment(
+            loader=source, autoescape=autoescape, bytecode_cache=FileSystemBytecodeCache(bytecode_dir)
+        ),
+        names,
+        args.repeat,
+    )
+    module_ms = load_all_ms(
+        lambda: Environment(loader=ModuleLoader(module_dir), autoescape=autoescape), names, args.repeat
+    )
+    print(f"  compile from source   {compile_ms:8.2f} ms")
+    print(f"  bytecode cache        {bytecode_ms:8.2f} ms")
+    print(f"  compiled modules      {module_ms:8.2f} ms")
+
+    batch = contexts(args.emails)
+    email_utils.precompile_templates()
+    print(f"render {args.emails} x {TEMPLATE} (best of 3):")
+
+    def best_us(render) -> float:
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1e6 / args.emails
+
+    def one_by_one():
+        for context in batch:
+            render_template(TEMPLATE, **context)
+
+    for auto_reload in (True, False):
+        email_utils.template_env.auto_reload = auto_reload
+        label = f"render_template, auto_reload={'on' if auto_reload else 'off'}"
+        print(f"  {label:<34}{best_us(one_by_one):8.1f} us/email")
+    assert render_many(TEMPLATE, batch[:1])[0] == render_template(TEMPLATE, **batch[0])
+    print(f"  {'render_many':<34}{best_us(lambda: render_many(TEMPLATE, batch)):8.1f} us/email")
+
+if __name__ == "__main__":
+    main()
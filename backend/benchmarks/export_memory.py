@@ -0,0 +1,83 @@
+"""Peak memory of the inventory export: streaming vs. building a list.
+
+For growing catalog sizes, measures the peak Python heap (tracemalloc)
+while consuming the streaming NDJSON export, and while building the old
+``.all()`` + ``List[ProductOut]`` response. Streaming should stay flat.
+
+Usage (from backend/):
+    python -m benchmarks.export_memory --rows 10000 50000 200000
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "dshop_bench_export.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+
+from sqlalchemy import insert  # noqa: E402
+import api  # noqa: E402,F401  (registers every mapper)
+from api.products import INVENTORY_EXPORT_COLUMNS  # noqa: E402
+from core.database import SessionLocal, engine  # noqa: E402
+from core.streaming import iter_export  # noqa: E402
+from models.base import Base  # noqa: E402
+from models.product import Product  # noqa: E402
+from schemas.product import ProductOut  # noqa: E402
+
+
+def seed(rows: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            conn.execute(
+                insert(Product),
+                [
+                    {"name": f"Product {i}", "description": "x" * 200, "price": 9.99,
+                     "stock": i % 50}
+                    for i in range(start, min(rows, start + 10000))
+                ],
+            )
+
+
+def peak_mib(fn) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def consume_stream():
+    for _ in iter_export(
+        lambda db: db.query(*[getattr(Product, c) for c in INVENTORY_EXPORT_COLUMNS])
+        .filter(Product.is_deleted == False)
+        .order_by(Product.id),
+        INVENTORY_EXPORT_COLUMNS,
+    ):
+        pass
+
+
+def build_list():
+    db = SessionLocal()
+    try:
+        products = db.query(Product).filter(Product.is_deleted == False).all()
+        [ProductOut.model_validate(p).model_dump(mode="json") for p in products]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 200000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'stream MiB':>12} {'list MiB':>10}")
+    for rows in args.rows:
+        seed(rows)
+        print(f"{rows:>8} {peak_mib(consume_stream):>12.1f} {peak_mib(build_list):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
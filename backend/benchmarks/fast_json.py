@@ -0,0 +1,131 @@
+"""Response time of the FAST_JSON list path vs. the response_model path.
+
+Seeds a catalog with tags and one customer's orders (two line items each),
+then requests GET /products/?limit=N, GET /orders/ and GET /orders/history
+through the ASGI app with FAST_JSON off and on, checks both paths return the
+same bytes and reports the median time per request. The product cache is
+disabled so every request queries and serializes.
+
+Usage (from backend/):
+    python -m benchmarks.fast_json --sizes 20 100 1000 --repeat 50
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "dshop_bench_fast_json.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+os.environ["PRODUCT_CACHE_ENABLED"] = "false"
+
+import logging  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+import api.orders  # noqa: E402
+import api.products  # noqa: E402
+from core.database import SessionLocal, engine  # noqa: E402
+from core.search import ensure_search_index  # noqa: E402
+from core.security import create_access_token  # noqa: E402
+from main import app  # noqa: E402
+from models.base import Base  # noqa: E402
+from models.order import Order, OrderItem  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.user import User  # noqa: E402
+
+EMAIL = "bench@example.com"
+
+
+def seed(rows: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    db = SessionLocal()
+    try:
+        user = User(email=EMAIL, hashed_password="x", email_verified=True)
+        db.add(user)
+        start = datetime(2024, 1, 1, 12, 0, 0, 123456)
+        for i in range(rows):
+            product = Product(
+                name=f"Product {i}",
+                description="lorem ipsum " * 8,
+                price=round(1 + i * 0.37, 2),
+                stock=i % 50,
+                category=f"category-{i % 12}",
+                brand=f"brand-{i % 40}",
+            )
+            product.tags = [f"tag-{i % 7}", f"tag-{i % 11}"]
+            db.add(product)
+        db.flush()
+        for i in range(rows):
+            order = Order(
+                user_id=user.id,
+                total_amount=round(5 + i * 1.13, 2),
+                status="paid" if i % 3 else "pending",
+                created_at=start + timedelta(minutes=i),
+            )
+            order.items = [
+                OrderItem(
+                    product_id=(i + n) % rows + 1,
+                    product_name=f"Product {(i + n) % rows}",
+                    quantity=n + 1,
+                    price=round(1 + i * 0.37, 2),
+                )
+                for n in range(2)
+            ]
+            db.add(order)
+        db.commit()
+    finally:
+        db.close()
+
+
+def set_fast(enabled: bool):
+    api.products.FAST_JSON = enabled
+    api.orders.FAST_JSON = enabled
+
+
+def median_ms(client, url, headers, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("ecommerce").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": EMAIL})}
+    print(f"{'endpoint':<34}{'regular ms':>12}{'fast ms':>10}{'speedup':>9}")
+    for size in args.sizes:
+        seed(size)
+        urls = [
+            f"/api/v1/products/?limit={size}",
+            "/api/v1/orders/",
+            # history pages are capped at 100 by paginate_query
+            f"/api/v1/orders/history?size={min(size, 100)}",
+        ]
+        for url in urls:
+            set_fast(False)
+            regular_body = client.get(url, headers=headers).content
+            regular = median_ms(client, url, headers, args.repeat)
+            set_fast(True)
+            fast_body = client.get(url, headers=headers).content
+            fast = median_ms(client, url, headers, args.repeat)
+            assert fast_body == regular_body, f"{url}: response bytes differ"
+            label = url.split("/api/v1")[1] + ("" if "limit" in url else f" ({size} rows)")
+            print(f"{label:<34}{regular:>12.2f}{fast:>10.2f}{regular / fast:>8.1f}x")
+    set_fast(False)
+
+
+if __name__ == "__main__":
+    main()
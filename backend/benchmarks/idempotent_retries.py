@@ -0,0 +1,112 @@
+"""Client retries of order placement with an Idempotency-Key.
+
+Seeds --checkouts customers (one cart each, plenty of stock) and sends every
+checkout --retries times at once from a thread pool, all copies carrying the
+customer's key, through core.idempotency.idempotent as POST /orders/place
+does. Asserts that each customer got exactly one order and one stock
+reservation and that every copy returned the same body, then reports the
+latency of the copy that ran checkout against the duplicates that waited
+for it or replayed the stored response.
+
+Usage (from backend/):
+    python -m benchmarks.idempotent_retries --checkouts 200 --retries 5 --threads 32
+
+Runs on a temporary SQLite database unless DATABASE_URL is set (use a
+scratch database: the tables are dropped and recreated).
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.checkout_concurrency import PLENTY, seed  # sets DATABASE_URL
+
+import logging  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from api.orders import checkout_cart  # noqa: E402
+from core.database import SessionLocal, engine  # noqa: E402
+from core.idempotency import REPLAYED_HEADER, idempotent  # noqa: E402
+from models.order import Order  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.user import User  # noqa: E402
+from schemas.order import OrderOut  # noqa: E402
+
+REQUEST = Request({"type": "http", "method": "POST", "path": "/api/v1/orders/place", "headers": []})
+
+
+def run(user_ids, retries: int, threads: int):
+    """Returns ({user id: set of bodies}, first latencies, duplicate latencies, wall)"""
+    bodies = {user_id: set() for user_id in user_ids}
+    first, duplicates = [], []
+    lock = threading.Lock()
+
+    def place(user_id: int):
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            user = db.get(User, user_id)
+            response = idempotent(
+                db,
+                f"checkout-{user_id}",
+                user_id,
+                REQUEST,
+                lambda: OrderOut.model_validate(checkout_cart(db, user)[0], from_attributes=True),
+            )
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - start
+        with lock:
+            bodies[user_id].add(response.body)
+            (duplicates if REPLAYED_HEADER in response.headers else first).append(elapsed)
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for user_id in user_ids:
+            for _ in range(retries):
+                pool.submit(place, user_id)
+    return bodies, first, duplicates, time.perf_counter() - wall
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+    logging.getLogger("ecommerce").setLevel(logging.WARNING)
+    print(
+        f"{engine.dialect.name}: {args.checkouts} checkouts x {args.retries} copies, "
+        f"{args.threads} threads"
+    )
+
+    user_ids, _ = seed(args.checkouts, 0, contended=False)
+    bodies, first, duplicates, wall = run(user_ids, args.retries, args.threads)
+
+    db = SessionLocal()
+    try:
+        orders = dict(
+            db.execute(select(Order.user_id, func.count()).group_by(Order.user_id)).all()
+        )
+        sold = db.scalar(select(func.sum(PLENTY - Product.stock)).where(Product.stock > 0))
+    finally:
+        db.close()
+    assert all(orders.get(user_id) == 1 for user_id in user_ids), "duplicate or missing orders"
+    assert sold == len(user_ids), f"{sold} units reserved for {len(user_ids)} orders"
+    assert all(len(b) == 1 for b in bodies.values()), "copies of one checkout got different bodies"
+    assert len(first) == len(user_ids) and len(duplicates) == len(user_ids) * (args.retries - 1)
+
+    print(f"{len(first) + len(duplicates)} requests in {wall:.2f} s, {len(orders)} orders placed")
+    for label, latencies in (("ran checkout", first), ("duplicates", duplicates)):
+        if latencies:
+            print(
+                f"  {label:<14} {len(latencies):>6}  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+                f"  max {max(latencies) * 1000:7.1f} ms"
+            )
+    print("exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Email throughput with a connection per message vs. the SMTP pool.
+
+Starts a local SMTP stand-in (EHLO, AUTH PLAIN, MAIL/RCPT/DATA, RSET, QUIT)
+that delays every reply by --rtt-ms to model the network round trip to the
+provider, then sends --messages emails from --threads threads:
+
+- per-message: what send_email used to do, connect + EHLO + AUTH + send +
+  QUIT for every message
+- pooled: core.email_utils.SMTPPool, one message per send() call
+- batched: SMTPPool.send_many with --batch messages per connection checkout,
+  as the outbox workers send
+
+and reports messages/second plus the pool's own metrics. STARTTLS is not
+simulated, so real providers (an extra TLS handshake per connection) gain
+more from pooling than shown here.
+
+Usage (from backend/):
+    python -m benchmarks.smtp_pool --messages 400 --threads 4 --rtt-ms 20
+"""
+
+import argparse
+import smtplib
+import socketserver
+import threading
+import time
+
+from core.email_utils import RateLimiter, SMTPPool, build_message
+
+FROM = "shop@example.com"
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib; counts accepted messages"""
+
+    def reply(self, line: str):
+        time.sleep(self.server.rtt)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250-stand-in\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+            elif command.startswith("AUTH"):
+                self.reply("235 2.7.0 Authentication successful")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.accepted += 1
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, rtt: float):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.rtt = rtt
+        self.accepted = 0
+        self.lock = threading.Lock()
+
+
+def messages(count: int):
+    return [
+        (f"customer{i}@example.com",
+         build_message(FROM, f"customer{i}@example.com", "Order Confirmation",
+                       f"Your order #{i} has been placed.", f"<p>Order #{i}</p>" * 20))
+        for i in range(count)
+    ]
+
+
+def per_message(port: int, to: str, message: str):
+    server = smtplib.SMTP("127.0.0.1", port)
+    try:
+        server.login(FROM, "secret")
+        server.sendmail(FROM, to, message)
+    finally:
+        server.quit()
+
+
+def run(label: str, work, threads: int, server: StandInServer, expected: int):
+    before = server.accepted
+    chunks = [work[i::threads] for i in range(threads)]
+    start = time.perf_counter()
+    workers = [threading.Thread(target=chunk_runner, args=(chunk,)) for chunk in chunks]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    sent = server.accepted - before
+    assert sent == expected, f"{label}: server accepted {sent} of {expected}"
+    print(f"{label:<14}{sent:>8} msgs {elapsed:>8.2f} s {sent / elapsed:>10.1f} msgs/s")
+    return sent / elapsed
+
+
+def chunk_runner(chunk):
+    for task in chunk:
+        task[0](*task[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=20)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--rate-limit", type=float, default=0, help="messages/second, 0 = off")
+    args = parser.parse_args()
+
+    server = StandInServer(args.rtt_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    mail = messages(args.messages)
+    print(f"{args.messages} messages, {args.threads} threads, {args.rtt_ms:g} ms per reply")
+
+    baseline = run(
+        "per-message",
+        [(per_message, port, to, message) for to, message in mail],
+        args.threads,
+        server,
+        args.messages,
+    )
+
+    def pool():
+        return SMTPPool(
+            "127.0.0.1", port, FROM, "secret", starttls=False, size=args.threads,
+            rate_limiter=RateLimiter(args.rate_limit, args.threads),
+        )
+
+    pooled = pool()
+    rate = run(
+        "pooled",
+        [(lambda to, message: pooled.send(FROM, to, message), to, message) for to, message in mail],
+        args.threads,
+        server,
+        args.messages,
+    )
+    pooled.close()
+
+    batched = pool()
+    batches = [mail[i : i + args.batch] for i in range(0, len(mail), args.batch)]
+
+    def send_batch(batch):
+        errors = batched.send_many(FROM, batch)
+        assert not any(errors), errors
+
+    batch_rate = run(
+        "batched",
+        [(send_batch, batch) for batch in batches],
+        args.threads,
+        server,
+        args.messages,
+    )
+    stats = batched.stats()
+    batched.close()
+    print(f"speedup: pooled {rate / baseline:.1f}x, batched {batch_rate / baseline:.1f}x")
+    print(
+        f"batched pool: {stats['connections_opened']} connections, "
+        f"{stats['messages_per_connection']:.0f} msgs/connection, "
+        f"send avg {stats['send_avg_ms']:.1f} ms max {stats['send_max_ms']:.1f} ms, "
+        f"rate-limit wait {stats['rate_limit_wait_ms']:.0f} ms"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Concurrent SQLite writers with and without the production profile.
+
+Runs the same mixed workload (checkout-like write transactions plus
+catalog reads) from many threads against a plain engine and against the
+profiled engine (WAL, synchronous=NORMAL, busy_timeout and the serialized
+writer), then reports committed writes/sec, "database is locked" errors and
+any other failure. Both pools are sized for every writer and reader thread
+(writers queued on the serialized writer hold a connection), and the run
+asserts that every write was either committed or counted as an error.
+
+Usage (from backend/):
+    python -m benchmarks.sqlite_writers --threads 16 --writes 200
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'dshop_bench.db')}"
+)
+
+from sqlalchemy import create_engine, exc, update  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+import api  # noqa: E402,F401  (registers every mapper)
+from core.database import create_db_engine  # noqa: E402
+from core.sqlite import SerializedWriter, SQLITE_PRAGMAS  # noqa: E402
+from models.base import Base  # noqa: E402
+from models.cart import Cart, CartItem  # noqa: E402
+from models.product import Product  # noqa: E402
+
+READERS = 4
+
+
+def build(profiled: bool, path: str, connections: int):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    url = f"sqlite:///{path}"
+    if profiled:
+        engine = create_db_engine(
+            url, name="bench_profiled", pool_size=connections, max_overflow=0
+        )
+        factory = sessionmaker(bind=engine, autoflush=False)
+        SerializedWriter(timeout=SQLITE_PRAGMAS["busy_timeout"] / 1000 * 2).install(
+            factory
+        )
+    else:
+        # Baseline: what the app used before the profile (1s busy wait)
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": 1},
+            pool_size=connections,
+            max_overflow=0,
+        )
+        factory = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(bind=engine)
+    db = factory()
+    db.add_all(Product(name=f"p{i}", price=1.0, stock=10**9) for i in range(50))
+    db.add(Cart(user_id=1))
+    db.commit()
+    db.close()
+    return engine, factory
+
+
+def run(factory, threads: int, writes: int):
+    errors = {"locked": 0, "other": 0, "reads": 0}
+    committed = [0]
+    finished = []
+    lock = threading.Lock()
+
+    def writer(worker: int):
+        for i in range(writes):
+            db = factory()
+            try:
+                product_id = (worker * writes + i) % 50 + 1
+                db.query(Product).filter(Product.id == product_id).first()
+                db.add(CartItem(cart_id=1, product_id=product_id, quantity=1))
+                db.execute(
+                    update(Product)
+                    .where(Product.id == product_id)
+                    .values(stock=Product.stock - 1)
+                )
+                db.commit()
+                with lock:
+                    committed[0] += 1
+            except exc.SQLAlchemyError as e:
+                db.rollback()
+                locked = isinstance(e, exc.OperationalError) and "locked" in str(e)
+                with lock:
+                    errors["locked" if locked else "other"] += 1
+            finally:
+                db.close()
+        with lock:
+            finished.append(worker)
+
+    def reader(stop: threading.Event):
+        while not stop.is_set():
+            db = factory()
+            try:
+                db.query(Product).filter(Product.stock > 0).limit(20).all()
+            except exc.SQLAlchemyError:
+                with lock:
+                    errors["reads"] += 1
+            finally:
+                db.close()
+
+    stop = threading.Event()
+    readers = [threading.Thread(target=reader, args=(stop,)) for _ in range(READERS)]
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in readers + workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in readers:
+        t.join()
+    assert len(finished) == threads, f"{threads - len(finished)} writer threads died"
+    accounted = committed[0] + errors["locked"] + errors["other"]
+    assert accounted == threads * writes, f"{accounted} of {threads * writes} writes accounted for"
+    return committed[0] / elapsed, committed[0], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "dshop_bench_writers.db")
+    print(
+        f"{'profile':<10} {'writes/s':>10} {'committed':>10} {'locked':>8} "
+        f"{'other':>6} {'read err':>9}"
+    )
+    for profiled in (False, True):
+        engine, factory = build(profiled, path, args.threads + READERS)
+        rate, committed, errors = run(factory, args.threads, args.writes)
+        engine.dispose()
+        name = "profiled" if profiled else "default"
+        print(
+            f"{name:<10} {rate:>10.1f} {committed:>10} "
+            f"{errors['locked']:>8} {errors['other']:>6} {errors['reads']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Latency and memory of the /products/suggest prefix index.
+
+Builds core.suggest.SuggestIndex in memory from a synthetic catalog (names
+of 3-4 words drawn Zipf-like from a fixed vocabulary, random popularity),
+replays search-as-you-type sequences (every prefix of a word, then the next
+word being typed) and reports lookup percentiles, the cost of incremental
+renames and the Python heap held by the index (tracemalloc).
+
+Usage (from backend/):
+    python -m benchmarks.suggest --products 1000000 --queries 50000
+"""
+
+import argparse
+import gc
+import itertools
+import random
+import statistics
+import time
+import tracemalloc
+
+from core.suggest import SuggestIndex
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "san", "vo", "ri", "den", "pa", "sh", "el", "tru",
+             "max", "on", "bel", "gra", "fi", "zen", "cor", "dus", "na", "pro", "lux", "wi"]
+
+
+def vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)  # popularity must not follow spelling
+    return words
+
+
+def catalog(products: int, words, rng: random.Random):
+    # Zipf-like: a few words are very common, most are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    for product_id in range(1, products + 1):
+        picked = rng.choices(words, cum_weights=cum_weights, k=rng.randint(3, 4))
+        yield product_id, " ".join(picked).title()
+
+
+def typing_queries(names, count: int, rng: random.Random):
+    queries = []
+    while len(queries) < count:
+        first, second = rng.choice(names).lower().split()[:2]
+        queries.extend(first[:n] for n in range(1, len(first) + 1))
+        queries.extend(f"{first} {second[:n]}" for n in range(1, len(second) + 1))
+    return queries[:count]
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))] * 1e6
+    return f"p50 {pick(0.5):7.1f} us  p99 {pick(0.99):7.1f} us  max {timings[-1] * 1e6:8.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=50_000)
+    parser.add_argument("--renames", type=int, default=2_000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    words = vocabulary(args.vocabulary, rng)
+    rows = list(catalog(args.products, words, rng))
+    scores = {product_id: int(rng.paretovariate(1.2)) for product_id, _ in rows}
+    names = [name for _, name in rows]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    index = SuggestIndex()
+    start = time.perf_counter()
+    index.begin_load()
+    index.load(rows, scores)
+    build = time.perf_counter() - start
+    gc.collect()
+    # Names are shared with the input rows; count them as the index's own
+    del rows
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    names_bytes = sum(len(name) + 49 for name in names)
+    print(f"build: {args.products} products in {build:.1f}s, {index.stats()}")
+    print(f"memory: {(held + names_bytes) / 2**20:.0f} MiB "
+          f"(index structures {held / 2**20:.0f} MiB + name strings {names_bytes / 2**20:.0f} MiB)")
+
+    queries = typing_queries(names, args.queries, rng)
+    for query in queries[:1000]:
+        index.suggest(query)  # warm up
+    timings = []
+    empty = 0
+    for query in queries:
+        start = time.perf_counter()
+        results = index.suggest(query)
+        timings.append(time.perf_counter() - start)
+        empty += not results
+    single = [t for q, t in zip(queries, timings) if " " not in q]
+    multi = [t for q, t in zip(queries, timings) if " " in q]
+    print(f"suggest, all {len(timings)}:    {percentiles(timings)}  (empty {empty})")
+    print(f"suggest, one word {len(single)}: {percentiles(single)}")
+    print(f"suggest, two words {len(multi)}: {percentiles(multi)}")
+
+    timings = []
+    for _ in range(args.renames):
+        product_id = rng.randint(1, args.products)
+        name = " ".join(rng.choices(words, k=3)).title()
+        start = time.perf_counter()
+        index.apply({product_id: name})
+        timings.append(time.perf_counter() - start)
+    print(f"rename, {args.renames}:        {percentiles(timings)}  "
+          f"mean {statistics.mean(timings) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
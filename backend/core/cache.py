@@ -0,0 +1,272 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from core.logging import logger
+from core.replicas import read_from_replica
+
+PRODUCT_CACHE_ENABLED = os.getenv("PRODUCT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", 2000))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", 60))
+# e.g. redis://localhost:6379/0; broadcasts invalidations to the other workers
+CACHE_INVALIDATION_URL = os.getenv("CACHE_INVALIDATION_URL")
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "product-cache")
+
+
+class ProductCache:
+    """Bounded LRU + TTL cache of product responses.
+
+    Entries are keyed ("product", id) for single products and ("list", skip,
+    limit) for list pages. Each list page remembers the ids it holds, so a
+    change to one product only drops that product and the pages showing it;
+    creates and deletes shift page boundaries and drop every page. The
+    ("collection",) entry holds the catalog version and goes on any change.
+
+    A generation counter guards against filling the cache with a row read
+    before a concurrent write committed: values are only stored if no
+    invalidation happened since the caller's snapshot(). Values read on a
+    replica are not stored either: the replica may not have the write that
+    just invalidated the entry yet, and the process-wide cache would keep
+    serving it to the writer after the read-your-writes window.
+    """
+
+    def __init__(self, max_size: int, ttl: float, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (expires_at, value, product ids)
+        self._pages_by_product = {}  # product id -> list keys containing it
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.replica_skips = 0
+
+    def snapshot(self) -> int:
+        return self._generation
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, product_ids, generation: int, session=None):
+        """Store value unless it was invalidated since generation, or was
+        read through session from a replica"""
+        if not self.enabled:
+            return
+        if session is not None and read_from_replica(session):
+            self.replica_skips += 1
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, product_ids)
+            if key[0] == "list":
+                for product_id in product_ids:
+                    self._pages_by_product.setdefault(product_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, product_ids = self._entries.pop(key)
+        if key[0] == "list":
+            for product_id in product_ids:
+                pages = self._pages_by_product.get(product_id)
+                if pages is not None:
+                    pages.discard(key)
+                    if not pages:
+                        del self._pages_by_product[product_id]
+
+    def invalidate(self, product_ids=(), lists: bool = False, broadcast: bool = True):
+        """Drop the given products (and pages showing them); lists=True drops
+        every list page as well."""
+        with self._lock:
+            self._generation += 1
+            keys = {("collection",)}
+            for product_id in product_ids:
+                keys.add(("product", product_id))
+                keys.update(self._pages_by_product.get(product_id, ()))
+            if lists:
+                keys.update(k for k in self._entries if k[0] == "list")
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+        if broadcast and invalidation_channel is not None:
+            invalidation_channel.publish(list(product_ids), lists)
+
+    def clear(self, broadcast: bool = True):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._pages_by_product.clear()
+        if broadcast and invalidation_channel is not None:
+            invalidation_channel.publish(None, True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "replica_skips": self.replica_skips,
+            "cross_worker": invalidation_channel is not None,
+        }
+
+
+class RedisInvalidationChannel:
+    """Relays invalidations between workers over Redis pub/sub"""
+
+    def __init__(self, url: str, channel: str, cache: ProductCache):
+        import redis  # optional dependency, only needed for this channel
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self.cache = cache
+        self.origin = uuid.uuid4().hex
+        self._thread = None
+        self._pubsub = None
+
+    def publish(self, product_ids, lists: bool):
+        message = json.dumps({"origin": self.origin, "ids": product_ids, "lists": lists})
+        try:
+            self.client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Cache invalidation broadcast failed: {e}")
+
+    def _handle(self, message):
+        data = json.loads(message["data"])
+        if data["origin"] == self.origin:
+            return
+        if data["ids"] is None:
+            self.cache.clear(broadcast=False)
+        else:
+            self.cache.invalidate(data["ids"], data["lists"], broadcast=False)
+
+    def start(self):
+        if self._thread:
+            return
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: self._handle})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self):
+        if self._thread:
+            self._thread.stop()
+            self._pubsub.close()
+            self._thread = None
+
+
+product_cache = ProductCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL, PRODUCT_CACHE_ENABLED)
+
+invalidation_channel = None
+if CACHE_INVALIDATION_URL and PRODUCT_CACHE_ENABLED:
+    try:
+        invalidation_channel = RedisInvalidationChannel(
+            CACHE_INVALIDATION_URL, CACHE_INVALIDATION_CHANNEL, product_cache
+        )
+    except ImportError:
+        logger.warning("CACHE_INVALIDATION_URL is set but redis is not installed")
+
+
+def start_invalidation_listener():
+    if invalidation_channel is not None:
+        invalidation_channel.start()
+
+
+def stop_invalidation_listener():
+    if invalidation_channel is not None:
+        invalidation_channel.stop()
+
+
+# Write-through invalidation: product rows flushed by any session are
+# recorded and dropped from the cache once the transaction commits, which
+# covers every write path (admin edits, stock changes, checkout).
+
+
+def _pending(session):
+    return session.info.setdefault("product_cache_pending", {"ids": set(), "lists": False})
+
+
+@event.listens_for(Session, "after_flush")
+def _record_product_changes(session, flush_context):
+    from models.product import Product
+
+    pending = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Product):
+            continue
+        pending = pending or _pending(session)
+        pending["ids"].add(obj.id)
+        if obj in session.new or obj in session.deleted:
+            pending["lists"] = True
+        elif inspect(obj).attrs.is_deleted.history.has_changes():
+            pending["lists"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_product_changes(orm_execute_state):
+    from models.product import Product
+
+    if (
+        (
+            orm_execute_state.is_insert
+            or orm_execute_state.is_update
+            or orm_execute_state.is_delete
+        )
+        and orm_execute_state.bind_mapper is not None
+        and orm_execute_state.bind_mapper.class_ is Product
+    ):
+        # Statements that don't name their rows (bulk writes, upserts) clear
+        # the cache; value-only UPDATEs of known rows can pass product_ids.
+        product_ids = orm_execute_state.execution_options.get("product_ids")
+        if product_ids is not None and orm_execute_state.is_update:
+            _pending(orm_execute_state.session)["ids"].update(product_ids)
+        else:
+            orm_execute_state.session.info["product_cache_clear"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    pending = session.info.pop("product_cache_pending", None)
+    if session.info.pop("product_cache_clear", False):
+        product_cache.clear()
+    elif pending:
+        product_cache.invalidate(pending["ids"], pending["lists"])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    session.info.pop("product_cache_pending", None)
+    session.info.pop("product_cache_clear", None)
@@ -1,11 +1,133 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 from models.base import Base
+from core.pool_metrics import (
+    InstrumentedQueuePool,
+    InstrumentedAsyncQueuePool,
+    instrument_pool,
+)
+from core.sqlite import SQLITE_PROFILE, apply_sqlite_pragmas, sqlite_writer
+from core.replicas import (
+    Replica,
+    ReplicaSet,
+    RoutingSession,
+    install_write_tracking,
+    db_read_only,
+)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ecommerce.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Connection pool configuration shared by every engine built here
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+def _engine_options(url: str, poolclass) -> dict:
+    url_obj = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if url_obj.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url_obj.database in (None, "", ":memory:") or "mode=memory" in str(url_obj):
+            # In-memory databases keep SQLAlchemy's single-connection pool
+            return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def create_db_engine(url: str = DATABASE_URL, name: str = "primary", **overrides):
+    """Build a sync engine with the configured, instrumented connection pool;
+    overrides replace individual options (e.g. pool_size)"""
+    engine = create_engine(url, **{**_engine_options(url, InstrumentedQueuePool), **overrides})
+    if SQLITE_PROFILE and engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine)
+    return instrument_pool(name, engine)
+
+
+def create_async_db_engine(url: str, name: str = "primary_async"):
+    """Build an AsyncEngine with the configured, instrumented connection pool"""
+    engine = create_async_engine(url, **_engine_options(url, InstrumentedAsyncQueuePool))
+    if SQLITE_PROFILE and engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine.sync_engine)
+    instrument_pool(name, engine.sync_engine)
+    return engine
+
+
+# Read replicas: comma-separated URLs with an optional "|weight" suffix
+DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", 10))
+
+
+def _build_replica_set(urls: str) -> ReplicaSet:
+    replicas = []
+    for index, entry in enumerate(u.strip() for u in urls.split(",") if u.strip()):
+        url, _, weight = entry.partition("|")
+        name = f"replica_{index}"
+        replicas.append(Replica(name, create_db_engine(url, name=name), int(weight or 1)))
+    return ReplicaSet(replicas, READ_YOUR_WRITES_SECONDS, REPLICA_HEALTH_INTERVAL)
+
+
+engine = create_db_engine(DATABASE_URL)
+replica_set = _build_replica_set(DATABASE_REPLICA_URLS)
+if replica_set:
+    SessionLocal = sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        replicas=replica_set,
+    )
+    install_write_tracking(SessionLocal, replica_set)
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if SQLITE_PROFILE and engine.dialect.name == "sqlite":
+    # Writers queue in-process instead of failing with "database is locked"
+    sqlite_writer.install(SessionLocal)
+
+# Async mode swaps the hot product/cart/order/auth handlers for native
+# async versions running on an AsyncEngine (see api/__init__.py).
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Sync driver -> asyncio driver used when DB_ASYNC is enabled
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Return the asyncio-driver equivalent of a sync database URL"""
+    url_obj = make_url(url)
+    driver = ASYNC_DRIVERS.get(url_obj.drivername, url_obj.drivername)
+    return url_obj.set(drivername=driver).render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_engine = create_async_db_engine(
+        os.getenv("ASYNC_DATABASE_URL", get_async_database_url(DATABASE_URL))
+    )
+    # expire_on_commit=False: attribute access after commit would otherwise
+    # trigger an implicit (and forbidden) lazy refresh outside of an await.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
 
 # Create tables (for dev/demo; use Alembic for production)
 Base.metadata.create_all(bind=engine)
@@ -17,3 +139,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def use_primary():
+    """Route dependency for GET handlers that must read their own writes"""
+    # async so the flag is set in the request context the handler inherits
+    db_read_only.set(False)
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled; set DB_ASYNC=true.")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,16 +1,75 @@
 # If you see 'Import "jinja2" could not be resolved', run: pip install jinja2
 import smtplib
 import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import (
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    ModuleLoader,
+    select_autoescape,
+)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "templates")
+# Compiled template bytecode, reused across restarts ("" disables)
+EMAIL_TEMPLATE_BYTECODE_DIR = os.getenv(
+    "EMAIL_TEMPLATE_BYTECODE_DIR", os.path.join(tempfile.gettempdir(), "dshop-jinja")
+)
+# Output of `python -m core.email_utils compile`; used first when present
+EMAIL_TEMPLATE_MODULE_DIR = os.getenv("EMAIL_TEMPLATE_MODULE_DIR", "")
+# Parsed templates kept in memory (LRU)
+EMAIL_TEMPLATE_CACHE_SIZE = int(os.getenv("EMAIL_TEMPLATE_CACHE_SIZE", 50))
+# Re-check template files on every render (development only)
+EMAIL_TEMPLATE_AUTO_RELOAD = os.getenv("EMAIL_TEMPLATE_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+
+
+TEMPLATE_EXTENSIONS = ["html", "txt"]
+
+
+def _template_loader():
+    loader = FileSystemLoader(TEMPLATE_DIR)
+    if EMAIL_TEMPLATE_MODULE_DIR and os.path.isdir(EMAIL_TEMPLATE_MODULE_DIR):
+        return ChoiceLoader([ModuleLoader(EMAIL_TEMPLATE_MODULE_DIR), loader])
+    return loader
+
+
+def _bytecode_cache():
+    if not EMAIL_TEMPLATE_BYTECODE_DIR:
+        return None
+    os.makedirs(EMAIL_TEMPLATE_BYTECODE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(EMAIL_TEMPLATE_BYTECODE_DIR)
+
 
 template_env = Environment(
-    loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), "templates")),
+    loader=_template_loader(),
     autoescape=select_autoescape(["html", "xml"]),
+    bytecode_cache=_bytecode_cache(),
+    cache_size=EMAIL_TEMPLATE_CACHE_SIZE,
+    auto_reload=EMAIL_TEMPLATE_AUTO_RELOAD,
 )
 
 
+def precompile_templates() -> int:
+    """Load every email template into the cache at startup (compiling, and
+    writing bytecode, only those not already in the bytecode cache)"""
+    names = [
+        name
+        for name in FileSystemLoader(TEMPLATE_DIR).list_templates()
+        if name.rsplit(".", 1)[-1] in TEMPLATE_EXTENSIONS
+    ]
+    for name in names:
+        template_env.get_template(name)
+    return len(names)
+
+
 def render_template(template_name: str = "", **context):
     if not template_name or not isinstance(template_name, str):
         raise ValueError("template_name must be a non-empty string")
@@ -18,17 +77,321 @@ def render_template(template_name: str = "", **context):
     return template.render(**context)
 
 
-def send_email(to: str, subject: str, body: str, html_body: str = None):
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    if not smtp_user or not smtp_password:
-        raise RuntimeError(
-            "SMTP_USER and SMTP_PASSWORD must be set in environment variables."
-        )
-    from_email = smtp_user
+def render_many(template_name: str, contexts):
+    """Render one template for many contexts (fan-out mail); the template
+    is looked up once"""
+    if not template_name or not isinstance(template_name, str):
+        raise ValueError("template_name must be a non-empty string")
+    template = template_env.get_template(template_name)
+    return [template.render(**context) for context in contexts]
+
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+# Authenticated connections kept open (and the most used at once)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+# Reconnect after this many messages, or when idle longer than the server
+# is likely to keep the session open
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", 60))
+# Messages per second allowed by the provider (0 = unlimited), and burst
+SMTP_RATE_LIMIT = float(os.getenv("SMTP_RATE_LIMIT", 0))
+SMTP_RATE_BURST = int(os.getenv("SMTP_RATE_BURST", 10))
+
+# Upper bounds (ms) of the send latency histogram buckets
+SEND_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+# Window (seconds) for the messages-per-second figure
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# Errors after which a connection is dropped and the message retried once
+# on a fresh one; other SMTP errors (e.g. refused recipients) are the
+# message's own and leave the connection usable.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+class RateLimiter:
+    """Token bucket shared by every thread sending to one provider"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Wait for a send slot; returns the seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SMTPMetrics:
+    """Thread-safe send counters for one SMTP pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.send_total_ms = 0.0
+        self.send_max_ms = 0.0
+        self.rate_limit_wait_ms = 0.0
+        self.send_buckets = [0] * len(SEND_BUCKETS_MS)
+        self._recent = deque()  # monotonic send times within the window
+
+    def observe_send(self, send_ms: float, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            if not ok:
+                self.failed += 1
+                return
+            self.sent += 1
+            self.send_total_ms += send_ms
+            self.send_max_ms = max(self.send_max_ms, send_ms)
+            for index, bound in enumerate(SEND_BUCKETS_MS):
+                if send_ms <= bound:
+                    self.send_buckets[index] += 1
+                    break
+            self._recent.append(now)
+            while self._recent[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                self._recent.popleft()
+
+    def record_connect(self, reconnect: bool = False):
+        with self._lock:
+            self.connections_opened += 1
+            self.reconnects += reconnect
+
+    def record_rate_limit_wait(self, seconds: float):
+        with self._lock:
+            self.rate_limit_wait_ms += seconds * 1000
 
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(1 for sent_at in self._recent if sent_at >= now - THROUGHPUT_WINDOW_SECONDS)
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "connections_opened": self.connections_opened,
+                "reconnects": self.reconnects,
+                "messages_per_connection": self.sent / self.connections_opened
+                if self.connections_opened
+                else 0.0,
+                "send_avg_ms": self.send_total_ms / self.sent if self.sent else 0.0,
+                "send_max_ms": self.send_max_ms,
+                "send_histogram_ms": {
+                    ("+Inf" if bound == float("inf") else str(bound)): count
+                    for bound, count in zip(SEND_BUCKETS_MS, self.send_buckets)
+                },
+                "messages_per_second": recent / THROUGHPUT_WINDOW_SECONDS,
+                "rate_limit_wait_ms": self.rate_limit_wait_ms,
+            }
+
+
+class SMTPPool:
+    """Reusable authenticated SMTP connections to one provider.
+
+    At most `size` connections are open; idle ones are kept for reuse until
+    they have sent max_messages or sat idle for idle_seconds. A connection
+    that fails mid-send is discarded and the message retried once on a new
+    one.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = None,
+        password: str = None,
+        starttls: bool = True,
+        size: int = SMTP_POOL_SIZE,
+        max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        idle_seconds: float = SMTP_IDLE_SECONDS,
+        rate_limiter: RateLimiter = None,
+        timeout: float = SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self.rate_limiter = rate_limiter or RateLimiter(0, 1)
+        self.timeout = timeout
+        self.metrics = SMTPMetrics()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []  # [connection, messages sent, last used]
+        self._lock = threading.Lock()
+
+    def _connect(self, reconnect: bool = False):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user:
+                server.login(str(self.user), str(self.password))
+        except Exception:
+            self._close(server)
+            raise
+        self.metrics.record_connect(reconnect)
+        return [server, 0, time.monotonic()]
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                entry = self._idle.pop()
+                if time.monotonic() - entry[2] < self.idle_seconds:
+                    return entry
+                self._close(entry[0])
+        return self._connect()
+
+    def _checkin(self, entry):
+        if entry[1] >= self.max_messages:
+            self._close(entry[0])
+            return
+        entry[2] = time.monotonic()
+        with self._lock:
+            self._idle.append(entry)
+
+    @contextmanager
+    def connection(self):
+        """A pooled connection entry for a run of sends"""
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry
+        except CONNECTION_ERRORS:
+            if entry is not None:
+                self._close(entry[0])
+                entry = None
+            raise
+        finally:
+            if entry is not None and entry[0].sock is not None:
+                self._checkin(entry)
+            self._slots.release()
+
+    def _send_on(self, entry, from_addr: str, to: str, message: str):
+        if entry[1] >= self.max_messages:
+            self._close(entry[0])
+            entry[:] = self._connect()
+        self.metrics.record_rate_limit_wait(self.rate_limiter.acquire())
+        start = time.perf_counter()
+        try:
+            try:
+                entry[0].sendmail(from_addr, to, message)
+            except CONNECTION_ERRORS:
+                self._close(entry[0])
+                entry[:] = self._connect(reconnect=True)
+                entry[0].sendmail(from_addr, to, message)
+        except Exception:
+            self.metrics.observe_send(0, ok=False)
+            raise
+        entry[1] += 1
+        self.metrics.observe_send((time.perf_counter() - start) * 1000, ok=True)
+
+    def send(self, from_addr: str, to: str, message: str):
+        with self.connection() as entry:
+            self._send_on(entry, from_addr, to, message)
+
+    def send_many(self, from_addr: str, messages):
+        """Send [(to, message)] over one connection; returns one exception
+        (or None) per message, in order"""
+        results = []
+        with self.connection() as entry:
+            for to, message in messages:
+                try:
+                    self._send_on(entry, from_addr, to, message)
+                    results.append(None)
+                except Exception as e:
+                    results.append(e)
+        return results
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry[0])
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "host": self.host,
+            "port": self.port,
+            "size": self.size,
+            "idle_connections": idle,
+            "max_messages_per_connection": self.max_messages,
+            "rate_limit_per_second": self.rate_limiter.rate,
+            **self.metrics.snapshot(),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def smtp_pool() -> SMTPPool:
+    """The process-wide pool for the configured provider"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            smtp_user = os.getenv("SMTP_USER")
+            smtp_password = os.getenv("SMTP_PASSWORD")
+            if not smtp_user or not smtp_password:
+                raise RuntimeError(
+                    "SMTP_USER and SMTP_PASSWORD must be set in environment variables."
+                )
+            _pool = SMTPPool(
+                SMTP_SERVER,
+                SMTP_PORT,
+                smtp_user,
+                smtp_password,
+                starttls=SMTP_STARTTLS,
+                rate_limiter=RateLimiter(SMTP_RATE_LIMIT, SMTP_RATE_BURST),
+            )
+        return _pool
+
+
+def close_smtp_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+
+
+def smtp_stats() -> dict:
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else {}
+
+
+def build_message(from_email: str, to: str, subject: str, body: str, html_body: str = None) -> str:
     msg = MIMEMultipart("alternative")
     msg["From"] = str(from_email)
     msg["To"] = str(to)
@@ -36,12 +399,38 @@ def send_email(to: str, subject: str, body: str, html_body: str = None):
     msg.attach(MIMEText(body, "plain"))
     if html_body:
         msg.attach(MIMEText(html_body, "html"))
+    return msg.as_string()
+
+
+def send_email(to: str, subject: str, body: str, html_body: str = None):
+    """Send one message over a pooled SMTP connection; raises on failure.
+
+    Request handlers queue mail with core.outbox.enqueue_email instead; the
+    outbox workers call send_emails and retry failures.
+    """
+    pool = smtp_pool()
+    pool.send(pool.user, str(to), build_message(pool.user, to, subject, body, html_body))
+
+
+def send_emails(emails):
+    """Send [(to, subject, body, html_body)] over one pooled connection;
+    returns one exception (or None) per email, in order"""
+    pool = smtp_pool()
+    return pool.send_many(
+        pool.user,
+        [(str(to), build_message(pool.user, to, subject, body, html_body))
+         for to, subject, body, html_body in emails],
+    )
+
 
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(str(smtp_user), str(smtp_password))
-        server.sendmail(str(from_email), str(to), msg.as_string())
-        server.quit()
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != "compile":
+        sys.exit("usage: python -m core.email_utils compile [target_dir]")
+    target = sys.argv[2] if len(sys.argv) == 3 else EMAIL_TEMPLATE_MODULE_DIR
+    if not target:
+        sys.exit("Pass a target directory or set EMAIL_TEMPLATE_MODULE_DIR")
+    # Compile from the source files only, whatever template_env loads from
+    Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR), autoescape=template_env.autoescape
+    ).compile_templates(target, extensions=TEMPLATE_EXTENSIONS, zip=None)
+    print(f"Compiled email templates into {target}")
@@ -0,0 +1,168 @@
+"""Maintained facet counts for catalog filtering.
+
+facet_counts holds, per (facet, value), the number of live products with
+that category, brand or tag. Every flush that creates, edits, soft-deletes
+or deletes products applies the difference between each product's old and
+new facet values to the table inside the same transaction, so reads are a
+single small SELECT instead of GROUP BYs over the catalog.
+
+Recompute from scratch (e.g. after raw SQL edits) with:
+    python -m core.facets rebuild
+"""
+
+import sys
+from collections import Counter
+from sqlalchemy import delete, event, func, inspect, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models.product import Product, ProductTag, FacetCount
+
+FACETS = ("category", "brand", "tag")
+# Product attributes whose changes move facet counts
+FACET_ATTRIBUTES = ("category", "brand", "is_deleted", "tag_links")
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history makes the ORM load the previous value before overwriting an
+# expired attribute, so the flush below always knows what to decrement.
+for _attribute in (Product.category, Product.brand, Product.is_deleted):
+    event.listen(_attribute, "set", _keep_old_value, active_history=True, retval=True)
+
+
+def _column_values(state, name: str):
+    """(old, new) value of a column attribute within the current flush"""
+    history = state.attrs[name].load_history()
+    new = state.attrs[name].value
+    old = history.deleted[0] if history.deleted else new
+    return old, new
+
+
+def _facet_values(category, brand, tags):
+    values = set()
+    if category:
+        values.add(("category", category))
+    if brand:
+        values.add(("brand", brand))
+    values.update(("tag", tag) for tag in tags)
+    return values
+
+
+def _product_delta(product: Product, is_new: bool, is_deleted: bool) -> Counter:
+    state = inspect(product)
+    old_category, new_category = _column_values(state, "category")
+    old_brand, new_brand = _column_values(state, "brand")
+    was_deleted, now_deleted = _column_values(state, "is_deleted")
+
+    links = state.attrs.tag_links.load_history()
+    kept = {link.tag for link in links.unchanged or ()}
+    old_tags = kept | {link.tag for link in links.deleted or ()}
+    new_tags = kept | {link.tag for link in links.added or ()}
+
+    old = set() if is_new or was_deleted else _facet_values(old_category, old_brand, old_tags)
+    new = set() if is_deleted or now_deleted else _facet_values(new_category, new_brand, new_tags)
+    delta = Counter()
+    for key in new - old:
+        delta[key] += 1
+    for key in old - new:
+        delta[key] -= 1
+    return delta
+
+
+def _apply_delta(connection, delta: Counter):
+    dialect = connection.dialect.name
+    # Sorted so concurrent transactions lock rows in the same order
+    for (facet, value), change in sorted(delta.items()):
+        if change == 0:
+            continue
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = dialect_insert(FacetCount).values(facet=facet, value=value, count=change)
+            connection.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[FacetCount.facet, FacetCount.value],
+                    set_={"count": FacetCount.count + stmt.excluded["count"]},
+                )
+            )
+            continue
+        result = connection.execute(
+            update(FacetCount)
+            .where(FacetCount.facet == facet, FacetCount.value == value)
+            .values(count=FacetCount.count + change)
+        )
+        if result.rowcount == 0:
+            connection.execute(
+                insert(FacetCount).values(facet=facet, value=value, count=change)
+            )
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_facet_counts(session, flush_context):
+    delta = Counter()
+    for obj in session.new:
+        if isinstance(obj, Product):
+            delta.update(_product_delta(obj, is_new=True, is_deleted=False))
+    for obj in session.dirty:
+        if isinstance(obj, Product):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in FACET_ATTRIBUTES):
+                delta.update(_product_delta(obj, is_new=False, is_deleted=False))
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            delta.update(_product_delta(obj, is_new=False, is_deleted=True))
+    if delta:
+        _apply_delta(session.connection(), delta)
+
+
+def facet_counts(db: Session) -> dict:
+    """{facet: {value: live product count}} for every facet"""
+    result = {facet: {} for facet in FACETS}
+    rows = db.execute(
+        select(FacetCount.facet, FacetCount.value, FacetCount.count)
+        .where(FacetCount.count > 0)
+        .order_by(FacetCount.facet, FacetCount.count.desc(), FacetCount.value)
+    )
+    for facet, value, count in rows:
+        result.setdefault(facet, {})[value] = count
+    return result
+
+
+def rebuild_facet_counts(db: Session):
+    """Recompute facet_counts from the products table"""
+    live = Product.is_deleted == False
+    db.execute(delete(FacetCount))
+    for facet, column in (("category", Product.category), ("brand", Product.brand)):
+        db.execute(
+            insert(FacetCount).from_select(
+                ["facet", "value", "count"],
+                select(literal(facet), column, func.count())
+                .where(live, column.is_not(None))
+                .group_by(column),
+            )
+        )
+    db.execute(
+        insert(FacetCount).from_select(
+            ["facet", "value", "count"],
+            select(literal("tag"), ProductTag.tag, func.count())
+            .join(Product, Product.id == ProductTag.product_id)
+            .where(live)
+            .group_by(ProductTag.tag),
+        )
+    )
+    db.commit()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m core.facets rebuild")
+    import api  # noqa: F401  (registers every mapper)
+    from core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_facet_counts(db)
+    finally:
+        db.close()
+    print("Facet counts rebuilt")
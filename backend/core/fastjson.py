@@ -0,0 +1,104 @@
+"""Opt-in fast JSON path for high-volume list endpoints.
+
+The regular path loads ORM objects, validates them against response_model
+with from_attributes and serializes the result. With FAST_JSON enabled,
+list endpoints instead select plain column tuples, validate them with a
+precompiled TypeAdapter over a TypedDict mirror of the response model
+(same fields, same order, same coercions) and encode with orjson.
+
+The bytes match the response_model output. One difference is known:
+orjson writes float exponents as 1e16 where pydantic writes 1e+16, which
+only affects floats at or above 1e16 or non-zero floats below 1e-4. Prices
+and totals never reach either range.
+"""
+
+import os
+from typing import Dict, List, Literal, Optional, Type, Union, get_args, get_origin
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import inspect
+from typing_extensions import TypedDict
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+_typed_dicts = {}
+
+
+def _plain_type(annotation):
+    """annotation with every BaseModel swapped for its TypedDict mirror"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return typed_dict_for(annotation)
+    args = get_args(annotation)
+    origin = get_origin(annotation)
+    if not args or origin is Literal:
+        return annotation
+    plain_args = tuple(_plain_type(arg) for arg in args)
+    if origin is Union:
+        return Union[plain_args]
+    return origin[plain_args]
+
+
+def typed_dict_for(model: Type[BaseModel]):
+    """A TypedDict with model's fields in declaration order.
+
+    Validating into a TypedDict yields plain dicts that orjson encodes
+    natively, without building model instances.
+    """
+    if model not in _typed_dicts:
+        _typed_dicts[model] = TypedDict(
+            f"{model.__name__}Dict",
+            {name: _plain_type(f.annotation) for name, f in model.model_fields.items()},
+        )
+    return _typed_dicts[model]
+
+
+class RowSerializer:
+    """Turns column rows into response_model-shaped dicts and JSON bytes"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapter = TypeAdapter(List[typed_dict_for(model)])
+        # Fields the rows don't select fall back to the model defaults
+        self.defaults = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items()
+            if not field.is_required()
+        }
+
+    def validate(self, rows, extra: Optional[Dict[str, list]] = None) -> List[dict]:
+        """rows: SQLAlchemy Row objects labelled with field names.
+
+        extra maps a field name to per-row values loaded separately (e.g.
+        a collection from a second query).
+        """
+        records = [{**self.defaults, **row._mapping} for row in rows]
+        for name, values in (extra or {}).items():
+            for record, value in zip(records, values):
+                record[name] = value
+        return self.adapter.validate_python(records)
+
+    def columns(self, entity):
+        """The mapped columns of entity that are model fields, labelled by
+        field name (other fields come from extra or the defaults)."""
+        mapped = inspect(entity).column_attrs.keys()
+        return [
+            getattr(entity, name).label(name)
+            for name in self.model.model_fields
+            if name in mapped
+        ]
+
+
+def json_response(content, headers: dict = None) -> Response:
+    return Response(
+        content=content if isinstance(content, bytes) else orjson.dumps(content),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def page_envelope(page: BaseModel, items: List[dict]) -> dict:
+    """A pagination model as a dict (field order kept) with encoded items"""
+    envelope = {name: getattr(page, name) for name in type(page).model_fields}
+    envelope["items"] = items
+    return envelope
@@ -0,0 +1,286 @@
+"""Idempotency-Key support for mutating checkout endpoints.
+
+A client that retries POST /orders/place (or a payment initiation) after a
+timeout sends the same Idempotency-Key header again. The first request to
+claim a key runs the handler; its response (2xx or 4xx) is stored in
+idempotency_keys and replayed, with an Idempotent-Replayed header, to every
+later request with that key until it expires (IDEMPOTENCY_TTL_SECONDS).
+
+Claims are committed before the handler runs, so a concurrent duplicate
+sees the key in progress and waits for the stored result (polling with
+backoff, up to IDEMPOTENCY_WAIT_SECONDS, then 409) instead of running
+checkout again. They use the request's own session, which has only read
+by then: a second pooled connection per request could exhaust the pool
+under load. A claim holds a lease (IDEMPOTENCY_LOCK_SECONDS) so the key of
+a crashed request can be retried; server errors release the key. Keys are
+scoped per user and bound to the request's method and path: reusing one
+for a different request is a 422.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from core.logging import logger
+from models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 60))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", 300))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# First and longest wait between checks on a key in progress
+POLL_MIN_SECONDS = 0.02
+POLL_MAX_SECONDS = 0.5
+PURGE_BATCH = 1000
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Marker returned by _claim while another request holds the key
+BUSY = object()
+
+# Notified whenever this process settles a key, so waiting duplicates
+# re-check at once instead of sleeping out their poll interval
+_settled = threading.Condition()
+_last_purge = 0.0
+
+
+def request_fingerprint(request: Request) -> str:
+    return hashlib.sha256(f"{request.method} {request.url.path}".encode()).hexdigest()
+
+
+def purge_expired(db: Session, limit: int = PURGE_BATCH) -> int:
+    """Delete up to `limit` expired keys; returns how many went"""
+    now = datetime.utcnow()
+    ids = db.execute(
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at <= now)
+        .order_by(IdempotencyKey.expires_at)
+        .limit(limit)
+    ).scalars().all()
+    if ids:
+        db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.id.in_(ids), IdempotencyKey.expires_at <= now
+            )
+        )
+    db.commit()
+    return len(ids)
+
+
+def _maybe_purge(db: Session):
+    global _last_purge
+    if time.monotonic() - _last_purge < IDEMPOTENCY_PURGE_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    try:
+        purge_expired(db)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Idempotency key purge failed: {e}")
+
+
+def _claim(db: Session, user_id: int, key: str, fingerprint: str):
+    """Returns a record id to run the request under, a stored
+    (status, body) to replay, or BUSY; ends db's transaction"""
+    db.commit()
+    _maybe_purge(db)
+    now = datetime.utcnow()
+    lease = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+    expires = now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    record = IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        fingerprint=fingerprint,
+        status="in_progress",
+        locked_until=lease,
+        created_at=now,
+        expires_at=expires,
+    )
+    db.add(record)
+    try:
+        db.commit()
+        return record.id
+    except IntegrityError:
+        db.rollback()
+    existing = db.execute(
+        select(
+            IdempotencyKey.id,
+            IdempotencyKey.fingerprint,
+            IdempotencyKey.status,
+            IdempotencyKey.locked_until,
+            IdempotencyKey.response_status,
+            IdempotencyKey.response_body,
+            IdempotencyKey.expires_at,
+        ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).one_or_none()
+    if existing is None:  # released or purged meanwhile
+        db.rollback()
+        return BUSY
+    expired = existing.expires_at <= now
+    if not expired and existing.fingerprint != fingerprint:
+        db.rollback()
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    if not expired and existing.status == "completed":
+        db.rollback()
+        return existing.response_status, existing.response_body
+    if not expired and existing.locked_until > now:
+        db.rollback()
+        return BUSY
+    # Expired, or its request died holding the lease: take it over
+    taken = db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.id == existing.id,
+            or_(
+                IdempotencyKey.expires_at <= now,
+                and_(
+                    IdempotencyKey.status == "in_progress",
+                    IdempotencyKey.locked_until <= now,
+                ),
+            ),
+        )
+        .values(
+            fingerprint=fingerprint,
+            status="in_progress",
+            locked_until=lease,
+            response_status=None,
+            response_body=None,
+            created_at=now,
+            expires_at=expires,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return existing.id if taken.rowcount == 1 else BUSY
+
+
+def _settle(db: Session, record_id: int, response: Optional[Response]):
+    """Store the response for replay, or release the key when None"""
+    try:
+        db.rollback()  # whatever the handler left unfinished
+        stmt = (
+            delete(IdempotencyKey)
+            if response is None
+            else update(IdempotencyKey).values(
+                status="completed",
+                locked_until=None,
+                response_status=response.status_code,
+                response_body=response.body.decode(),
+                expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+            )
+        )
+        db.execute(
+            stmt.where(IdempotencyKey.id == record_id, IdempotencyKey.status == "in_progress")
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Could not settle idempotency key {record_id}: {e}")
+    with _settled:
+        _settled.notify_all()
+
+
+def _replay(stored) -> Response:
+    status_code, body = stored
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def _in_progress():
+    return HTTPException(
+        status_code=409,
+        detail="A request with this Idempotency-Key is still in progress",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _outcome(result=None, error: Exception = None) -> Optional[Response]:
+    """The response to store: handler results and client errors replay,
+    anything else releases the key for a retry"""
+    if error is None:
+        return JSONResponse(jsonable_encoder(result))
+    if isinstance(error, HTTPException) and error.status_code < 500:
+        return JSONResponse({"detail": error.detail}, status_code=error.status_code)
+    return None
+
+
+def _check_key(key: str):
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters",
+        )
+
+
+def idempotent(db: Session, key: Optional[str], user_id: int, request: Request, handler):
+    """Run handler() at most once per key (sync routes).
+
+    handler returns the JSON content of the response (a pydantic model,
+    dict, ...); without a key it simply runs.
+    """
+    if key is None:
+        return handler()
+    _check_key(key)
+    fingerprint = request_fingerprint(request)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    delay = POLL_MIN_SECONDS
+    while (claim := _claim(db, user_id, key, fingerprint)) is BUSY:
+        if time.monotonic() >= deadline:
+            raise _in_progress()
+        with _settled:
+            _settled.wait(delay)
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+    if not isinstance(claim, int):
+        return _replay(claim)
+    try:
+        result = handler()
+    except Exception as e:
+        _settle(db, claim, _outcome(error=e))
+        raise
+    response = _outcome(result)
+    _settle(db, claim, response)
+    return response
+
+
+async def idempotent_async(db, key: Optional[str], user_id: int, request: Request, handler):
+    """idempotent() for async routes (db is an AsyncSession); handler is a
+    coroutine function"""
+    if key is None:
+        return await handler()
+    _check_key(key)
+    fingerprint = request_fingerprint(request)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    delay = POLL_MIN_SECONDS
+    while (claim := await db.run_sync(_claim, user_id, key, fingerprint)) is BUSY:
+        if time.monotonic() >= deadline:
+            raise _in_progress()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+    if not isinstance(claim, int):
+        return _replay(claim)
+    try:
+        result = await handler()
+    except Exception as e:
+        await db.run_sync(_settle, claim, _outcome(error=e))
+        raise
+    response = _outcome(result)
+    await db.run_sync(_settle, claim, response)
+    return response
@@ -0,0 +1,210 @@
+"""Product image uploads and derivative rendering.
+
+Upload request bodies are capped while they are received (UploadLimitRoute),
+before FastAPI's multipart parser spools the file, then copied to disk in
+chunks and named by the SHA-256 of their content. The original is kept outside the served static
+directory; a process pool renders resized, metadata-free WebP and JPEG
+derivatives next to the other public images, and the product row is updated
+with their URLs when rendering finishes.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from core.logging import logger
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "../static")
+IMAGE_DIR = os.path.join(STATIC_DIR, "images")
+ORIGINALS_DIR = os.path.join(STATIC_DIR, "originals")  # not mounted/served
+IMAGE_URL_PREFIX = "/static/images"
+
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+IMAGE_UPLOAD_CHUNK = 1024 * 1024
+# Allowance for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 82))
+
+# Variant name -> longest edge in pixels
+IMAGE_VARIANTS = {"thumbnail": 160, "listing": 480, "detail": 1200}
+IMAGE_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+IMAGE_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+os.makedirs(IMAGE_DIR, exist_ok=True)
+os.makedirs(ORIGINALS_DIR, exist_ok=True)
+
+_executor = None
+
+
+def _too_large():
+    return HTTPException(
+        status_code=413, detail=f"Image exceeds {IMAGE_MAX_UPLOAD_BYTES} bytes"
+    )
+
+
+class UploadLimitRoute(APIRoute):
+    """Route class for upload endpoints: FastAPI parses (and spools) multipart
+    bodies before the handler or its dependencies run, so the size cap is
+    enforced on the raw body instead. A Content-Length over the cap is
+    rejected before anything is read; otherwise the body is counted as it
+    arrives and the request fails with 413 as soon as it passes
+    IMAGE_MAX_UPLOAD_BYTES plus MULTIPART_OVERHEAD_BYTES, so at most that
+    much is ever spooled."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        limit = IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+
+        async def limited_handler(request: Request):
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > limit:
+                raise _too_large()
+            receive = request.receive
+            received = 0
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise _too_large()
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
+
+
+def save_upload(stream, extension: str):
+    """Copy an upload to ORIGINALS_DIR chunk by chunk; returns (digest, path).
+
+    Raises 413 once more than IMAGE_MAX_UPLOAD_BYTES have been read. This is
+    the exact per-file cap; the request body was already bounded while it
+    was received (UploadLimitRoute).
+    """
+    sha = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=ORIGINALS_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := stream.read(IMAGE_UPLOAD_CHUNK):
+                size += len(chunk)
+                if size > IMAGE_MAX_UPLOAD_BYTES:
+                    raise _too_large()
+                sha.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        digest = sha.hexdigest()[:32]
+        path = os.path.join(ORIGINALS_DIR, f"{digest}{extension.lower()}")
+        os.replace(temp_path, path)
+        return digest, path
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def verify_image(path: str):
+    """Reject files Pillow cannot identify as an image (header check only)"""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="File is not a supported image")
+
+
+def variant_urls(digest: str) -> dict:
+    return {
+        variant: {
+            fmt: f"{IMAGE_URL_PREFIX}/{digest}-{variant}.{IMAGE_EXTENSIONS[fmt]}"
+            for fmt in IMAGE_FORMATS
+        }
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def render_derivatives(source_path: str, digest: str) -> dict:
+    """Render every variant/format of one original (runs in a worker process).
+
+    Pillow writes no EXIF/ICC/XMP unless asked, so the derivatives carry no
+    metadata; orientation is applied to the pixels first.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    for variant, edge in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        for fmt, pil_format in IMAGE_FORMATS.items():
+            path = os.path.join(IMAGE_DIR, f"{digest}-{variant}.{IMAGE_EXTENSIONS[fmt]}")
+            if os.path.exists(path):
+                continue  # same content was rendered before
+            out = resized
+            if pil_format == "JPEG" and out.mode == "RGBA":
+                out = Image.new("RGB", out.size, (255, 255, 255))
+                out.paste(resized, mask=resized.getchannel("A"))
+            temp_path = path + ".part"
+            out.save(temp_path, pil_format, quality=IMAGE_QUALITY, optimize=True)
+            os.replace(temp_path, path)
+    return variant_urls(digest)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs DB pools and threads is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _store_variants(product_id: int, digest: str, future):
+    from core.database import SessionLocal
+    from models.product import Product
+
+    try:
+        variants = future.result()
+    except Exception as e:
+        logger.error(f"Image derivatives failed for product {product_id}: {e}")
+        return
+    db = SessionLocal()
+    try:
+        product = db.get(Product, product_id)
+        # A newer upload may have replaced this one while it was rendering
+        if product is None or product.image_hash != digest:
+            return
+        product.image_variants = variants
+        product.image_url = variants["detail"]["jpeg"]
+        db.commit()
+        logger.info(f"Image derivatives ready for product {product_id}")
+    finally:
+        db.close()
+
+
+def schedule_derivatives(product_id: int, source_path: str, digest: str):
+    """Render derivatives off the request path and attach them to the product"""
+    future = _get_executor().submit(render_derivatives, source_path, digest)
+    future.add_done_callback(lambda f: _store_variants(product_id, digest, f))
+    return future
+
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,123 @@
+"""Set-based stock changes.
+
+Stock is only ever changed by UPDATE statements that compute the new value
+in SQL and guard it (stock >= 0) in the WHERE clause, so concurrent writers
+cannot lose each other's updates or drive stock negative.
+
+Each statement carries the product_ids execution option: it marks a
+stock-only change to exactly those products, which the low-stock set
+(core.stock_alerts) re-checks and the suggest index (core.suggest) skips.
+Bulk product UPDATEs without it are treated as touching any column of any
+row.
+
+Databases without UPDATE ... RETURNING (MySQL) lock and read the rows first,
+so the guarded UPDATE's outcome is known before it runs.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+from models.product import Product
+
+# Products per UPDATE statement (one CASE branch each)
+STOCK_UPDATE_CHUNK = 500
+
+
+def collapse_adjustments(adjustments) -> Dict[int, Tuple[Optional[int], int]]:
+    """Fold each product's adjustments, in order, into (absolute, delta).
+
+    An absolute value replaces everything before it; later deltas add to it.
+    """
+    folded = {}
+    for adjustment in adjustments:
+        absolute, delta = folded.get(adjustment.product_id, (None, 0))
+        if adjustment.absolute is not None:
+            absolute, delta = adjustment.absolute, 0
+        else:
+            delta += adjustment.delta
+        folded[adjustment.product_id] = (absolute, delta)
+    return folded
+
+
+def _new_stock(absolute: Optional[int], delta: int):
+    if absolute is not None:
+        return absolute + delta
+    return Product.stock + delta
+
+
+def apply_stock_changes(
+    db: Session, changes: Dict[int, Tuple[Optional[int], int]]
+) -> Tuple[Dict[int, int], List[int]]:
+    """Apply folded changes with guarded UPDATE ... RETURNING statements.
+
+    Returns ({product_id: new stock}, [rejected product ids]). Rows whose
+    result would be negative, and unknown or deleted products, are left
+    untouched. The caller owns the transaction.
+    """
+    updated = {}
+    product_ids = list(changes)
+    returning = db.get_bind().dialect.update_returning
+    for start in range(0, len(product_ids), STOCK_UPDATE_CHUNK):
+        chunk = product_ids[start : start + STOCK_UPDATE_CHUNK]
+        if not returning:
+            chunk = _lock_applicable(db, changes, chunk)
+            if not chunk:
+                continue
+        new_stock = case(
+            {pid: _new_stock(*changes[pid]) for pid in chunk}, value=Product.id
+        )
+        stmt = (
+            update(Product)
+            .where(Product.id.in_(chunk), Product.is_deleted == False, new_stock >= 0)
+            .values(stock=new_stock)
+            .execution_options(synchronize_session=False, product_ids=chunk)
+        )
+        if returning:
+            updated.update(db.execute(stmt.returning(Product.id, Product.stock)).tuples().all())
+        else:
+            db.execute(stmt)
+            updated.update(_stock_of(db, chunk))
+    rejected = [pid for pid in product_ids if pid not in updated]
+    return updated, rejected
+
+
+def _lock_applicable(db: Session, changes, chunk: List[int]) -> List[int]:
+    """Lock the chunk's live rows and return the ids the guarded UPDATE will
+    change; the lock holds their stock until the transaction ends"""
+    stock = dict(
+        db.execute(
+            select(Product.id, Product.stock)
+            .where(Product.id.in_(chunk), Product.is_deleted == False)
+            .order_by(Product.id)
+            .with_for_update()
+        ).tuples().all()
+    )
+    applicable = []
+    for pid in chunk:
+        if pid not in stock:
+            continue
+        absolute, delta = changes[pid]
+        if (stock[pid] if absolute is None else absolute) + delta >= 0:
+            applicable.append(pid)
+    return applicable
+
+
+def _stock_of(db: Session, product_ids: List[int]) -> Dict[int, int]:
+    return dict(
+        db.execute(
+            select(Product.id, Product.stock).where(Product.id.in_(product_ids))
+        ).tuples().all()
+    )
+
+
+def current_stock(db: Session, product_ids: List[int]) -> Dict[int, int]:
+    """Stock of the given live products (missing ids are absent)"""
+    if not product_ids:
+        return {}
+    return dict(
+        db.execute(
+            select(Product.id, Product.stock).where(
+                Product.id.in_(product_ids), Product.is_deleted == False
+            )
+        ).tuples().all()
+    )
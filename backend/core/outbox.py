@@ -0,0 +1,301 @@
+"""Transactional email outbox.
+
+Request handlers queue email with enqueue_email on their own session, so
+the message is committed (or rolled back) together with the business
+change and the request never talks to SMTP. EMAIL_WORKERS background
+threads claim due rows in batches, send each batch over one pooled SMTP
+connection (core.email_utils.send_emails) and record the outcome:
+
+- sent: status "sent"
+- failed: retried after an exponential backoff (EMAIL_RETRY_BASE_SECONDS,
+  doubling per attempt up to EMAIL_RETRY_MAX_SECONDS, with jitter)
+- failed EMAIL_MAX_ATTEMPTS times: status "dead" (dead letter), kept for
+  inspection at GET /admin/email-outbox and requeued with
+  POST /admin/email-outbox/requeue
+
+Claims are conditional UPDATEs with a lease (EMAIL_LEASE_SECONDS), so
+several workers and processes can drain the same table; rows whose worker
+died are claimed again once the lease runs out. Databases without
+UPDATE ... RETURNING (MySQL) lock the candidates FOR UPDATE SKIP LOCKED
+instead and read the claimed rows back. Commits that queue email
+wake this process's workers; otherwise they poll every
+EMAIL_OUTBOX_POLL_SECONDS. Set EMAIL_WORKERS=0 to deliver from a separate
+process instead:
+    python -m core.outbox run
+"""
+
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.orm import Session
+from core import email_utils
+from core.logging import logger
+from models.email import EmailOutbox
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", 2))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 5))
+EMAIL_OUTBOX_BATCH = int(os.getenv("EMAIL_OUTBOX_BATCH", 20))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", 300))
+
+
+def enqueue_email(db, to: str, subject: str, body: str, html_body: str = None):
+    """Queue an email in db's current transaction (sync or async session);
+    it is delivered only if that transaction commits"""
+    db.add(
+        EmailOutbox(
+            to=str(to),
+            subject=str(subject),
+            body=body,
+            html_body=html_body,
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+    )
+    db.info["outbox_enqueued"] = True
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retry number `attempts` (1 after the first failure)"""
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _due(now: datetime):
+    return or_(
+        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == "sending", EmailOutbox.locked_until < now),
+    )
+
+
+CLAIMED_COLUMNS = (
+    EmailOutbox.id,
+    EmailOutbox.to,
+    EmailOutbox.subject,
+    EmailOutbox.body,
+    EmailOutbox.html_body,
+    EmailOutbox.attempts,
+)
+
+
+def claim_batch(db: Session, limit: int = EMAIL_OUTBOX_BATCH):
+    """Lease up to `limit` due emails to this worker; rows other workers
+    claimed first are skipped"""
+    now = datetime.utcnow()
+    returning = db.get_bind().dialect.update_returning
+    candidates = (
+        select(EmailOutbox.id)
+        .where(_due(now))
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+    )
+    if not returning:
+        candidates = candidates.with_for_update(skip_locked=True)
+    ids = db.execute(candidates).scalars().all()
+    if not ids:
+        db.rollback()
+        return []
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), _due(now))
+        .values(
+            status="sending",
+            locked_until=now + timedelta(seconds=EMAIL_LEASE_SECONDS),
+            attempts=EmailOutbox.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if returning:
+        claimed = db.execute(stmt.returning(*CLAIMED_COLUMNS)).all()
+    else:
+        # The rows stay locked by this transaction, so all of them are ours
+        db.execute(stmt)
+        claimed = db.execute(
+            select(*CLAIMED_COLUMNS)
+            .where(EmailOutbox.id.in_(ids))
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        ).all()
+    db.commit()
+    return claimed
+
+
+def _record_outcome(db: Session, email, error: Exception = None):
+    now = datetime.utcnow()
+    if error is None:
+        values = {"status": "sent", "sent_at": now, "last_error": None}
+    elif email.attempts >= EMAIL_MAX_ATTEMPTS:
+        logger.error(f"Email {email.id} to {email.to} dead after {email.attempts} attempts: {error}")
+        values = {"status": "dead", "last_error": str(error)[:1000]}
+    else:
+        logger.warning(f"Email {email.id} to {email.to} failed (attempt {email.attempts}): {error}")
+        values = {
+            "status": "pending",
+            "next_attempt_at": now + timedelta(seconds=retry_delay(email.attempts)),
+            "last_error": str(error)[:1000],
+        }
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == email.id, EmailOutbox.status == "sending")
+        .values(locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def deliver_batch(limit: int = EMAIL_OUTBOX_BATCH) -> int:
+    """Claim and send one batch; returns the number of emails claimed"""
+    from core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        claimed = claim_batch(db, limit)
+        if not claimed:
+            return 0
+        try:
+            errors = email_utils.send_emails(
+                [(email.to, email.subject, email.body, email.html_body) for email in claimed]
+            )
+        except Exception as e:  # no connection at all
+            errors = [e] * len(claimed)
+        for email, error in zip(claimed, errors):
+            _record_outcome(db, email, error)
+        return len(claimed)
+    finally:
+        db.close()
+
+
+class OutboxWorker:
+    """Background threads draining the outbox"""
+
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                claimed = deliver_batch()
+            except Exception as e:
+                logger.error(f"Email outbox worker failed: {e}")
+                claimed = 0
+            if claimed:
+                continue
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopped.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"email-outbox-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop after the batches in progress (unsent rows stay queued)"""
+        self._stopped.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=30)
+        self._threads = []
+
+
+outbox_worker = OutboxWorker(EMAIL_WORKERS, EMAIL_OUTBOX_POLL_SECONDS)
+
+
+def start_outbox_worker():
+    if EMAIL_WORKERS > 0:
+        outbox_worker.start()
+
+
+def stop_outbox_worker():
+    outbox_worker.stop()
+
+
+def outbox_stats(db: Session) -> dict:
+    """Row counts per status, the oldest due email and recent dead letters"""
+    counts = dict(
+        db.execute(
+            select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+        ).tuples().all()
+    )
+    oldest_due = db.scalar(
+        select(func.min(EmailOutbox.next_attempt_at)).where(EmailOutbox.status == "pending")
+    )
+    dead = db.execute(
+        select(
+            EmailOutbox.id,
+            EmailOutbox.to,
+            EmailOutbox.subject,
+            EmailOutbox.attempts,
+            EmailOutbox.last_error,
+            EmailOutbox.created_at,
+        )
+        .where(EmailOutbox.status == "dead")
+        .order_by(EmailOutbox.id.desc())
+        .limit(50)
+    ).mappings().all()
+    return {
+        "counts": {status: counts.get(status, 0) for status in ("pending", "sending", "sent", "dead")},
+        "oldest_pending": oldest_due,
+        "dead": [dict(row) for row in dead],
+    }
+
+
+def requeue_dead(db: Session, ids=None) -> int:
+    """Give dead letters (all, or the given ids) a fresh set of attempts"""
+    stmt = update(EmailOutbox).where(EmailOutbox.status == "dead")
+    if ids:
+        stmt = stmt.where(EmailOutbox.id.in_(ids))
+    result = db.execute(
+        stmt.values(status="pending", attempts=0, next_attempt_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    outbox_worker.wake()
+    return result.rowcount
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_outbox_worker(session):
+    if session.info.pop("outbox_enqueued", False):
+        outbox_worker.wake()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_enqueued(session, previous_transaction):
+    session.info.pop("outbox_enqueued", None)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in (["run"], ["requeue"]):
+        sys.exit("usage: python -m core.outbox run|requeue")
+    import api  # noqa: F401  (registers every mapper)
+    from core.database import SessionLocal
+
+    if sys.argv[1] == "requeue":
+        db = SessionLocal()
+        try:
+            print(f"Requeued {requeue_dead(db)} dead emails")
+        finally:
+            db.close()
+        sys.exit()
+    worker = OutboxWorker(max(EMAIL_WORKERS, 1), EMAIL_OUTBOX_POLL_SECONDS)
+    worker.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        worker.stop()
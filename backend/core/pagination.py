@@ -1,29 +1,118 @@
-from typing import TypeVar, Generic, List, Optional
+from typing import TypeVar, Generic, Dict, List, Optional, Literal
 from pydantic import BaseModel
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Query
-from fastapi import Query as FastAPIQuery
+from fastapi import HTTPException, Query as FastAPIQuery
+from datetime import datetime
+import base64
+import json
+import os
+import threading
+import time
 
 T = TypeVar("T")
 
 
+# How paginate_query obtains "total":
+#   exact     - COUNT(*) over the filtered query on every call
+#   cached    - exact count, reused for PAGINATION_COUNT_TTL seconds per filter set
+#   estimated - planner row estimate (PostgreSQL); other databases use "cached"
+#   none      - no total; has_next comes from fetching size + 1 rows
+CountStrategy = Literal["exact", "cached", "estimated", "none"]
+
+PAGINATION_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL", 60))
+PAGINATION_COUNT_CACHE_SIZE = 1024
+
+_count_cache = {}  # (sql, params) -> (expires_at, total)
+_count_cache_lock = threading.Lock()
+
+
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    total: Optional[int]
     page: int
     size: int
-    pages: int
+    pages: Optional[int]
     has_next: bool
     has_prev: bool
+    count_strategy: CountStrategy = "exact"
+
+
+def _compile(query: Query, dialect):
+    """The unordered query as SQL for dialect; IN lists are expanded into
+    plain bound parameters instead of POSTCOMPILE placeholders"""
+    return query.order_by(None).statement.compile(
+        dialect=dialect, compile_kwargs={"render_postcompile": True}
+    )
+
+
+def _count_cache_key(query: Query):
+    # The compiled filter SQL plus its bound values identify the filter set
+    compiled = _compile(query, query.session.get_bind().dialect)
+    return str(compiled), repr(sorted(compiled.params.items()))
+
 
+def _cached_count(query: Query) -> int:
+    key = _count_cache_key(query)
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    total = query.order_by(None).count()
+    with _count_cache_lock:
+        if len(_count_cache) >= PAGINATION_COUNT_CACHE_SIZE:
+            _count_cache.pop(next(iter(_count_cache)))
+        _count_cache[key] = (now + PAGINATION_COUNT_TTL, total)
+    return total
 
-def paginate_query(query: Query, page: int = 1, size: int = 20) -> PaginatedResponse:
-    """Paginate a SQLAlchemy query"""
+
+def _estimated_count(query: Query) -> Optional[int]:
+    """Planner row estimate, or None where no cheap estimate exists"""
+    bind = query.session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = _compile(query, bind.dialect)
+    plan = (
+        query.session.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+        .scalar()
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginate_query(
+    query: Query, page: int = 1, size: int = 20, count: CountStrategy = "exact"
+) -> PaginatedResponse:
+    """Paginate a SQLAlchemy query using the requested count strategy"""
     if page < 1:
         page = 1
     if size < 1 or size > 100:
         size = 20
 
-    total = query.count()
+    if count == "none":
+        items = query.offset((page - 1) * size).limit(size + 1).all()
+        return PaginatedResponse(
+            items=items[:size],
+            total=None,
+            page=page,
+            size=size,
+            pages=None,
+            has_next=len(items) > size,
+            has_prev=page > 1,
+            count_strategy="none",
+        )
+
+    total = None
+    if count == "estimated":
+        total = _estimated_count(query)
+        if total is None:
+            count = "cached"
+    if count == "cached":
+        total = _cached_count(query)
+    elif count == "exact":
+        total = query.count()
     items = query.offset((page - 1) * size).limit(size).all()
 
     pages = (total + size - 1) // size  # Ceiling division
@@ -36,6 +125,109 @@ def paginate_query(query: Query, page: int = 1, size: int = 20) -> PaginatedResp
         pages=pages,
         has_next=page < pages,
         has_prev=page > 1,
+        count_strategy=count,
+    )
+
+
+class FacetedPage(PaginatedResponse[T], Generic[T]):
+    """A page of results plus {facet: {value: count}} for the catalog"""
+
+    facets: Dict[str, Dict[str, int]]
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    size: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    has_next: bool
+    has_prev: bool
+
+
+def encode_cursor(sort_value, row_id: int, direction: str = "next") -> str:
+    """Opaque cursor holding the last sort key plus id"""
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    payload = json.dumps({"k": sort_value, "i": row_id, "d": direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return (sort value, id, direction) from an encoded cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value = payload["k"]
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        if payload["d"] not in ("next", "prev"):
+            raise ValueError(payload["d"])
+        return sort_value, int(payload["i"]), payload["d"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate_keyset(
+    query: Query,
+    sort_column,
+    id_column,
+    descending: bool = False,
+    cursor: Optional[str] = None,
+    size: int = 20,
+) -> CursorPage:
+    """Paginate a SQLAlchemy query by (sort key, id) instead of OFFSET.
+
+    Each page is an index range scan starting after the cursor row, so deep
+    pages cost the same as the first one.
+    """
+    if size < 1 or size > 100:
+        size = 20
+
+    direction = "next"
+    if cursor:
+        sort_value, row_id, direction = decode_cursor(cursor)
+    # Walking backwards scans in the opposite order, then flips the page
+    backwards = direction == "prev"
+    scan_desc = descending != backwards
+
+    if cursor:
+        if scan_desc:
+            after = or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < row_id),
+            )
+        else:
+            after = or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, id_column > row_id),
+            )
+        query = query.filter(after)
+    if scan_desc:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    rows = query.limit(size + 1).all()
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, more
+    else:
+        has_next, has_prev = more, cursor is not None
+
+    def row_cursor(row, row_direction):
+        return encode_cursor(
+            getattr(row, sort_column.key), getattr(row, id_column.key), row_direction
+        )
+
+    return CursorPage(
+        items=rows,
+        size=size,
+        next_cursor=row_cursor(rows[-1], "next") if rows and has_next else None,
+        prev_cursor=row_cursor(rows[0], "prev") if rows and has_prev else None,
+        has_next=has_next,
+        has_prev=has_prev,
     )
 
 
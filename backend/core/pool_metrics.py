@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# SQLAlchemy names pool loggers after the pool class's module; keep the
+# instrumented pools as quiet as the stock ones under the app's INFO config.
+logging.getLogger(__name__).setLevel(logging.WARNING)
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, float("inf"))
+
+
+class PoolMetrics:
+    """Thread-safe counters for one connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.overflow_events = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS_MS)
+
+    def observe_wait(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for index, bound in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+
+    def record_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def record_overflow(self):
+        with self._lock:
+            self.overflow_events += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "overflow_events": self.overflow_events,
+                "wait_avg_ms": self.wait_total_ms / self.checkouts
+                if self.checkouts
+                else 0.0,
+                "wait_max_ms": self.wait_max_ms,
+                "wait_histogram_ms": {
+                    ("+Inf" if bound == float("inf") else str(bound)): count
+                    for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)
+                },
+            }
+
+
+class InstrumentedPoolMixin:
+    """Records checkout wait time, overflow growth and checkout timeouts"""
+
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.record_timeout()
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.observe_wait((time.perf_counter() - start) * 1000)
+
+    def _inc_overflow(self):
+        grew = super()._inc_overflow()
+        # _overflow starts at -pool_size; above zero means beyond pool_size
+        if grew and self._overflow > 0 and self.metrics:
+            self.metrics.record_overflow()
+        return grew
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Every instrumented engine registers here under a readable name
+pool_registry = {}
+
+
+def instrument_pool(name: str, engine):
+    """Attach metrics to an engine's pool and register it for reporting"""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedPoolMixin):
+        pool.metrics = PoolMetrics(name)
+    pool_registry[name] = engine
+    return engine
+
+
+def pool_status() -> dict:
+    """Live pool state plus collected metrics for every registered engine"""
+    status = {}
+    for name, engine in pool_registry.items():
+        pool = engine.pool
+        entry = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                    "max_overflow": pool._max_overflow,
+                    "timeout": pool.timeout(),
+                }
+            )
+        metrics = getattr(pool, "metrics", None)
+        if metrics:
+            entry.update(metrics.snapshot())
+        status[name] = entry
+    return status
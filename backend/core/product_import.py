@@ -0,0 +1,190 @@
+"""Bulk product import: CSV/NDJSON rows upserted by sku in batches.
+
+Each batch is validated row by row, de-duplicated on sku (last row wins),
+written with a single multi-row INSERT ... ON CONFLICT (sku) DO UPDATE (ON
+DUPLICATE KEY UPDATE on MySQL/MariaDB) and committed together with one aggregated AuditLog record.
+
+CLI (from backend/):
+    python -m core.product_import products.ndjson [--format csv] [--batch-size 2000]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Literal
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from models.audit import AuditLog
+from models.product import Product
+from schemas.product import ProductImportRow, ProductImportResult, ImportRowError
+
+ImportFormat = Literal["csv", "ndjson"]
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 2000))
+# Row errors returned in the report; the rest are only counted
+IMPORT_MAX_ERRORS = 1000
+
+# Columns an upsert overwrites on an existing sku
+UPSERT_COLUMNS = ["name", "description", "price", "stock", "image_url", "updated_at"]
+
+
+def detect_format(filename: str) -> ImportFormat:
+    return "csv" if (filename or "").lower().endswith(".csv") else "ndjson"
+
+
+def iter_rows(stream, format: ImportFormat):
+    """Yield (line number, dict or error message) from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if format == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                # Empty cells mean "not given" so field defaults apply
+                yield reader.line_num, {k: v for k, v in row.items() if k and v != ""}
+            return
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, f"Invalid JSON: {e}"
+                continue
+            yield line_no, row if isinstance(row, dict) else "Expected a JSON object"
+    finally:
+        text.detach()  # leave the caller's stream open
+
+
+def _upsert_statement(dialect: str):
+    if dialect in ("mysql", "mariadb"):
+        # sku is the only unique key an imported row can collide on
+        stmt = mysql.insert(Product)
+        return stmt.on_duplicate_key_update(
+            {name: stmt.inserted[name] for name in UPSERT_COLUMNS}
+        )
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise HTTPException(
+            status_code=501, detail=f"Bulk import is not supported on {dialect}"
+        )
+    stmt = insert(Product)
+    return stmt.on_conflict_do_update(
+        index_elements=[Product.sku],
+        set_={name: stmt.excluded[name] for name in UPSERT_COLUMNS},
+    )
+
+
+class ProductImporter:
+    """Accumulates rows and flushes them to the database in batches"""
+
+    def __init__(self, db: Session, user_id: int = None, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.statement = _upsert_statement(db.get_bind().dialect.name)
+        self.result = ProductImportResult(
+            rows=0, upserted=0, failed=0, batches=0, errors=[]
+        )
+        self._batch = {}  # sku -> row values (last occurrence wins)
+
+    def _error(self, line: int, sku, errors):
+        self.result.failed += 1
+        if len(self.result.errors) < IMPORT_MAX_ERRORS:
+            self.result.errors.append(ImportRowError(line=line, sku=sku, errors=errors))
+        else:
+            self.result.errors_truncated = True
+
+    def add(self, line: int, row):
+        self.result.rows += 1
+        if isinstance(row, str):
+            self._error(line, None, [row])
+            return
+        try:
+            product = ProductImportRow.model_validate(row)
+        except ValidationError as e:
+            self._error(
+                line,
+                row.get("sku"),
+                [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()],
+            )
+            return
+        self._batch[product.sku] = product.model_dump()
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        now = datetime.utcnow()
+        values = [
+            {**row, "created_at": now, "updated_at": now, "is_deleted": False}
+            for row in self._batch.values()
+        ]
+        self.result.batches += 1
+        self.db.execute(self.statement, values)
+        self.db.add(
+            AuditLog(
+                user_id=self.user_id,
+                action="bulk_upsert",
+                target_type="product",
+                details={
+                    "batch": self.result.batches,
+                    "count": len(values),
+                    "skus": list(self._batch),
+                },
+            )
+        )
+        self.db.commit()
+        self.result.upserted += len(values)
+        self._batch = {}
+
+
+def import_products(
+    db: Session,
+    stream,
+    format: ImportFormat,
+    user_id: int = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ProductImportResult:
+    """Validate and upsert every row of a CSV/NDJSON stream.
+
+    Batches commit independently: a failure part-way leaves earlier batches
+    in place, and re-running the same file is safe because rows upsert.
+    """
+    importer = ProductImporter(db, user_id, batch_size)
+    for line, row in iter_rows(stream, format):
+        importer.add(line, row)
+    importer.flush()
+    return importer.result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import products (upsert by sku)")
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    import api  # noqa: F401  (registers every mapper)
+    from core.database import SessionLocal
+
+    format = args.format or detect_format(args.path)
+    db = SessionLocal()
+    try:
+        if args.path == "-":
+            result = import_products(db, sys.stdin.buffer, format, batch_size=args.batch_size)
+        else:
+            with open(args.path, "rb") as stream:
+                result = import_products(db, stream, format, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(result.model_dump_json(indent=2))
@@ -0,0 +1,68 @@
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from core.logging import logger
+
+# Same statement shape more often than this in one request looks like N+1
+DB_REPEATED_QUERY_THRESHOLD = int(os.getenv("DB_REPEATED_QUERY_THRESHOLD", 10))
+# Raise instead of warning (for test runs)
+DB_QUERY_STRICT = os.getenv("DB_QUERY_STRICT", "false").lower() in ("1", "true", "yes")
+
+# Collapse expanded IN lists / VALUES rows so they count as one shape
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%s|:\w+|\$\d+)\s*,)+\s*(?:\?|%s|:\w+|\$\d+)\s*\)")
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised in strict mode when a request repeats one statement too often"""
+
+
+class QueryStats:
+    """Statements issued while serving one request"""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        shape = _PARAM_LIST.sub("(?)", statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == DB_REPEATED_QUERY_THRESHOLD + 1:
+            message = (
+                f"Repeated query in {self.label}: statement ran more than "
+                f"{DB_REPEATED_QUERY_THRESHOLD} times (possible N+1): {shape[:200]}"
+            )
+            if DB_QUERY_STRICT:
+                raise RepeatedQueryError(message)
+            logger.warning(message)
+
+
+current_query_stats: ContextVar[QueryStats] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def start_query_stats(label: str = "") -> QueryStats:
+    """Begin collecting statements for the current request context"""
+    stats = QueryStats(label)
+    current_query_stats.set(stats)
+    return stats
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - context.query_start_time) * 1000)
@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event, text, Insert, Update, Delete
+from sqlalchemy.orm import Session
+from core.logging import logger
+
+# Per-request routing context, set by the middleware in main.py
+db_read_only: ContextVar[bool] = ContextVar("db_read_only", default=False)
+db_request_user: ContextVar[str] = ContextVar("db_request_user", default=None)
+
+
+class Replica:
+    def __init__(self, name: str, engine, weight: int = 1):
+        self.name = name
+        self.engine = engine
+        self.weight = weight
+        self.healthy = True
+
+
+class ReplicaSet:
+    """Weighted, health-checked read replicas plus read-your-writes tracking"""
+
+    def __init__(self, replicas, read_your_writes_seconds: float, health_interval: float):
+        self.replicas = replicas
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.health_interval = health_interval
+        self._recent_writers = {}  # user key -> time until reads stay on primary
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def choose(self):
+        """Pick a healthy replica by weight; None sends the read to the primary"""
+        healthy = [r for r in self.replicas if r.healthy and r.weight > 0]
+        if not healthy:
+            return None
+        return random.choices(healthy, weights=[r.weight for r in healthy])[0]
+
+    def mark_write(self, user_key: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._recent_writers) > 10000:
+                self._recent_writers = {
+                    k: v for k, v in self._recent_writers.items() if v > now
+                }
+            self._recent_writers[user_key] = now + self.read_your_writes_seconds
+
+    def wrote_recently(self, user_key: str) -> bool:
+        return self._recent_writers.get(user_key, 0) > time.monotonic()
+
+    def check_health(self):
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy = True
+            except Exception as e:
+                healthy = False
+                error = e
+            if healthy != replica.healthy:
+                if healthy:
+                    logger.info(f"Replica {replica.name} is healthy again")
+                else:
+                    logger.warning(f"Replica {replica.name} marked unhealthy: {error}")
+            replica.healthy = healthy
+
+    def start_health_checks(self):
+        if not self.replicas or self._thread:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._thread = threading.Thread(target=run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+        self._thread = None
+
+    def status(self) -> list:
+        return [
+            {"name": r.name, "weight": r.weight, "healthy": r.healthy}
+            for r in self.replicas
+        ]
+
+
+class RoutingSession(Session):
+    """Sends reads of read-only requests to a replica and everything else to
+    the primary bind.
+
+    A session sticks to one replica, and moves to the primary for good once
+    it writes. Users who committed a write within the read-your-writes window
+    keep reading from the primary.
+    """
+
+    def __init__(self, *args, replicas: ReplicaSet = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        if (
+            not self.replicas
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or self.info.get("wrote")
+            or not db_read_only.get()
+        ):
+            return primary
+        user_key = db_request_user.get()
+        if user_key and self.replicas.wrote_recently(user_key):
+            return primary
+        replica = self.info.get("replica")
+        if replica is None or not replica.healthy:
+            replica = self.replicas.choose()
+            self.info["replica"] = replica
+        if replica is None:
+            return primary
+        self.info["read_replica"] = True
+        return replica.engine
+
+
+def read_from_replica(session) -> bool:
+    """Whether any read of the session went to a (possibly lagging) replica"""
+    return bool(session.info.get("read_replica"))
+
+
+def install_write_tracking(session_factory, replicas: ReplicaSet):
+    """Record writes so the session and its user stay on the primary"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _after_flush(session, flush_context):
+        session.info["wrote"] = True
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _after_bulk_write(orm_execute_state):
+        if (
+            orm_execute_state.is_insert
+            or orm_execute_state.is_update
+            or orm_execute_state.is_delete
+        ):
+            orm_execute_state.session.info["wrote"] = True
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        user_key = db_request_user.get()
+        if session.info.get("wrote") and user_key:
+            replicas.mark_write(user_key)
+
+    return session_factory
@@ -0,0 +1,138 @@
+"""Full-text product search.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers;
+PostgreSQL uses a GIN index over the same to_tsvector() expression the
+queries use. Other databases (or SQLite builds without FTS5) fall back to
+ILIKE matching.
+
+Rebuild the index from the products table with:
+    python -m core.search rebuild
+"""
+
+import re
+import sys
+from sqlalchemy import column, func, literal_column, or_, table, text
+from sqlalchemy.exc import OperationalError
+from core.logging import logger
+
+FTS_TABLE = "products_fts"
+SEARCH_LANGUAGE = "english"
+
+_fts = table(FTS_TABLE, column("rowid"), column(FTS_TABLE), column("rank"))
+
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description
+    ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+SQLITE_FTS_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+# Queries must repeat the indexed expression verbatim for the planner to
+# use the GIN index, hence literal SQL rather than bound parameters.
+POSTGRES_DOCUMENT = (
+    f"to_tsvector('{SEARCH_LANGUAGE}', "
+    "coalesce(products.name, '') || ' ' || coalesce(products.description, ''))"
+)
+POSTGRES_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_products_search ON products "
+    f"USING GIN ({POSTGRES_DOCUMENT.replace('products.', '')})"
+)
+
+# Dialects whose full-text index exists and is usable
+_ready_dialects = set()
+
+
+def ensure_search_index(engine):
+    """Create the full-text index objects if missing (dev/demo startup)"""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                for statement in SQLITE_FTS_DDL:
+                    conn.execute(text(statement))
+            elif dialect == "postgresql":
+                conn.execute(text(POSTGRES_INDEX_DDL))
+            else:
+                return
+        _ready_dialects.add(dialect)
+    except OperationalError as e:
+        logger.warning(f"Full-text search unavailable, using ILIKE: {e}")
+
+
+def rebuild_search_index(engine):
+    """Repopulate the index from the products table"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            for statement in SQLITE_FTS_DROP + SQLITE_FTS_DDL + [SQLITE_FTS_REBUILD]:
+                conn.execute(text(statement))
+        elif engine.dialect.name == "postgresql":
+            conn.execute(text("DROP INDEX IF EXISTS ix_products_search"))
+            conn.execute(text(POSTGRES_INDEX_DDL))
+    _ready_dialects.add(engine.dialect.name)
+
+
+def _fts5_query(terms: str):
+    # Quote every token so user input cannot inject FTS5 syntax; the
+    # trailing * makes the last token a prefix match for partial words.
+    tokens = re.findall(r"\w+", terms)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"' for t in tokens) + "*"
+
+
+def apply_search(query, model, terms: str, rank: bool = True):
+    """Filter a Product query to full-text matches of terms.
+
+    With rank=True the result is ordered by relevance; callers that sort
+    on their own columns pass rank=False.
+    """
+    dialect = query.session.get_bind().dialect.name
+    if dialect == "sqlite" and dialect in _ready_dialects:
+        match = _fts5_query(terms)
+        if match is None:
+            return query
+        query = query.join(_fts, _fts.c.rowid == model.id).filter(
+            _fts.c[FTS_TABLE].match(match)
+        )
+        return query.order_by(_fts.c.rank) if rank else query
+    if dialect == "postgresql" and dialect in _ready_dialects:
+        document = literal_column(POSTGRES_DOCUMENT)
+        ts_query = func.websearch_to_tsquery(SEARCH_LANGUAGE, terms)
+        query = query.filter(document.op("@@")(ts_query))
+        return query.order_by(func.ts_rank(document, ts_query).desc()) if rank else query
+    search_term = f"%{terms}%"
+    return query.filter(
+        or_(model.name.ilike(search_term), model.description.ilike(search_term))
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m core.search rebuild")
+    import api  # noqa: F401  (registers every mapper)
+    from core.database import engine
+
+    rebuild_search_index(engine)
+    print("Product search index rebuilt")
@@ -1,6 +1,9 @@
 from fastapi import Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import User
+from core.database import get_db, get_async_db
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
@@ -58,24 +61,43 @@ def decode_token(token: str):
 # User dependencies
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(lambda: None)
-):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _email_from_token(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if not isinstance(email, str) or not email:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return email
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email = _email_from_token(token)
     user = db.query(User).filter(User.email == email, User.is_deleted == False).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+):
+    email = _email_from_token(token)
+    result = await db.execute(
+        select(User).where(User.email == email, User.is_deleted == False)
+    )
+    user = result.scalars().first()
+    if user is None:
+        raise _credentials_exception()
     return user
 
 
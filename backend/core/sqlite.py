@@ -0,0 +1,91 @@
+import os
+import threading
+from sqlalchemy import event
+from core.logging import logger
+
+# Pragmas applied to every new SQLite connection when the profile is enabled
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "true").lower() in ("1", "true", "yes")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),  # ms
+    "temp_store": "MEMORY",
+}
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict = None):
+    """Run the profile pragmas on each connection the engine opens"""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+class SerializedWriter:
+    """Process-wide single-writer gate for SQLite sessions.
+
+    SQLite allows one writer at a time; with several threads racing for the
+    database lock, losers spin on busy_timeout and eventually fail with
+    "database is locked". Sessions instead queue here from their first write
+    until commit/rollback, so writers take turns in-process while WAL readers
+    keep reading without blocking.
+
+    A session usually reaches the gate after its first read, so writers
+    waiting here each hold a pooled connection: size the pool
+    (DB_POOL_SIZE + DB_MAX_OVERFLOW) for the number of concurrent writers
+    plus readers, or the excess waits out DB_POOL_TIMEOUT and fails.
+    """
+
+    def __init__(self, timeout: float):
+        self._lock = threading.Lock()
+        self.timeout = timeout
+
+    def acquire(self, session):
+        if session.info.get("sqlite_writer"):
+            return
+        # On timeout fall through to SQLite's own busy handling rather than
+        # deadlocking (e.g. two sessions writing from the same thread).
+        if self._lock.acquire(timeout=self.timeout):
+            session.info["sqlite_writer"] = True
+        else:
+            logger.warning("SQLite writer queue timeout; continuing unserialized")
+
+    def release(self, session):
+        if session.info.pop("sqlite_writer", False):
+            self._lock.release()
+
+    def install(self, session_factory):
+        """Hook the gate into every session created by session_factory"""
+
+        @event.listens_for(session_factory, "before_flush")
+        def _queue_flush(session, flush_context, instances):
+            self.acquire(session)
+
+        @event.listens_for(session_factory, "do_orm_execute")
+        def _queue_bulk_write(orm_execute_state):
+            if (
+                orm_execute_state.is_insert
+                or orm_execute_state.is_update
+                or orm_execute_state.is_delete
+            ):
+                self.acquire(orm_execute_state.session)
+
+        @event.listens_for(session_factory, "after_transaction_end")
+        def _leave_queue(session, transaction):
+            # Only the outermost transaction ends the write (commit, rollback
+            # or close); savepoints leave the database lock held.
+            if transaction.parent is None:
+                self.release(session)
+
+        return session_factory
+
+
+sqlite_writer = SerializedWriter(timeout=SQLITE_PRAGMAS["busy_timeout"] / 1000 * 2)
@@ -0,0 +1,343 @@
+"""Maintained low-stock set and threshold-crossing alerts.
+
+low_stock_products holds every live product whose stock is below
+LOW_STOCK_THRESHOLD. Commits that change stock or is_deleted (ORM flushes,
+guarded bulk UPDATEs tagged with product_ids, checkout) re-check only the
+touched products against the set inside the same transaction; other bulk
+statements on products (bulk import upserts, untagged UPDATEs) re-check the
+whole set, which is an index range scan on products.stock. Reports read the small set
+instead of filtering the catalog.
+
+Each change of membership is a crossing: a product going low, running out,
+coming back from zero while still low, or being restocked above the
+threshold. Crossings are published after the commit to the SSE stream at
+GET /products/low-stock/events and, when LOW_STOCK_WEBHOOK_URL is set,
+POSTed to that URL in batches by a background thread.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import and_, bindparam, case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from core.logging import logger
+from models.product import Product, LowStockProduct
+
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", 10))
+LOW_STOCK_WEBHOOK_URL = os.getenv("LOW_STOCK_WEBHOOK_URL", "")
+LOW_STOCK_WEBHOOK_TIMEOUT = float(os.getenv("LOW_STOCK_WEBHOOK_TIMEOUT", 5))
+# Product ids per membership check (bound parameters per statement)
+LOW_STOCK_SYNC_CHUNK = 500
+# Events buffered per SSE subscriber / for the webhook before dropping
+ALERT_QUEUE_SIZE = 1000
+WEBHOOK_BATCH_SIZE = 100
+SSE_KEEPALIVE_SECONDS = 15
+
+# Product attributes whose changes can move a product in or out of the set
+STOCK_COLUMNS = {"stock", "is_deleted"}
+
+
+def _crossing(kind: str, product_id: int, name: str, stock: int, previous_stock, now: datetime):
+    return {
+        "event": kind,
+        "product_id": product_id,
+        "name": name,
+        "stock": stock,
+        "previous_stock": previous_stock,
+        "threshold": LOW_STOCK_THRESHOLD,
+        "at": now.isoformat(),
+    }
+
+
+def _upsert_flags(connection, rows):
+    """Flag rows' products; a concurrent commit may have flagged them first"""
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(LowStockProduct)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LowStockProduct.product_id],
+            set_={"stock": stmt.excluded.stock},
+        )
+        connection.execute(stmt, rows)
+        return
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(LowStockProduct)
+        stmt = stmt.on_duplicate_key_update(stock=stmt.inserted.stock)
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            update(LowStockProduct)
+            .where(LowStockProduct.product_id == row["product_id"])
+            .values(stock=row["stock"])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(LowStockProduct).values(**row))
+
+
+def _sync(connection, low: dict, flagged: dict, now: datetime) -> list:
+    """Bring the flags for low | flagged in line with low
+    ({id: (name, stock)} of live low products); returns the crossings"""
+    events = []
+    added = [pid for pid in sorted(low) if pid not in flagged]
+    removed = sorted(pid for pid in flagged if pid not in low)
+    changed = [pid for pid in sorted(low) if pid in flagged and low[pid][1] != flagged[pid]]
+
+    if added:
+        _upsert_flags(
+            connection,
+            [{"product_id": pid, "stock": low[pid][1], "flagged_at": now} for pid in added],
+        )
+        for pid in added:
+            name, stock = low[pid]
+            kind = "out_of_stock" if stock == 0 else "low_stock"
+            events.append(_crossing(kind, pid, name, stock, None, now))
+    if changed:
+        connection.execute(
+            update(LowStockProduct)
+            .where(LowStockProduct.product_id == bindparam("pid"))
+            .values(stock=bindparam("new_stock")),
+            [{"pid": pid, "new_stock": low[pid][1]} for pid in changed],
+        )
+        for pid in changed:
+            name, stock = low[pid]
+            if stock == 0 or flagged[pid] == 0:
+                kind = "out_of_stock" if stock == 0 else "low_stock"
+                events.append(_crossing(kind, pid, name, stock, flagged[pid], now))
+    for start in range(0, len(removed), LOW_STOCK_SYNC_CHUNK):
+        chunk = removed[start : start + LOW_STOCK_SYNC_CHUNK]
+        connection.execute(delete(LowStockProduct).where(LowStockProduct.product_id.in_(chunk)))
+        # Restocked products are still live; deleted ones just leave the set
+        restocked = connection.execute(
+            select(Product.id, Product.name, Product.stock).where(
+                Product.id.in_(chunk), Product.is_deleted == False
+            )
+        )
+        for pid, name, stock in restocked:
+            events.append(_crossing("restocked", pid, name, stock, flagged[pid], now))
+    return events
+
+
+def sync_low_stock(connection, product_ids=None) -> list:
+    """Re-check product_ids (or every product when None) against the set.
+
+    Runs on the caller's connection and transaction; returns the crossings.
+    """
+    live_low = and_(Product.stock < LOW_STOCK_THRESHOLD, Product.is_deleted == False)
+    low_query = select(Product.id, Product.name, Product.stock).where(live_low)
+    flagged_query = select(LowStockProduct.product_id, LowStockProduct.stock)
+    now = datetime.utcnow()
+    if product_ids is None:
+        low = {pid: (name, stock) for pid, name, stock in connection.execute(low_query)}
+        flagged = dict(connection.execute(flagged_query).tuples().all())
+        return _sync(connection, low, flagged, now)
+    events = []
+    product_ids = sorted(product_ids)
+    for start in range(0, len(product_ids), LOW_STOCK_SYNC_CHUNK):
+        chunk = product_ids[start : start + LOW_STOCK_SYNC_CHUNK]
+        low = {
+            pid: (name, stock)
+            for pid, name, stock in connection.execute(low_query.where(Product.id.in_(chunk)))
+        }
+        flagged = dict(
+            connection.execute(
+                flagged_query.where(LowStockProduct.product_id.in_(chunk))
+            ).tuples().all()
+        )
+        events.extend(_sync(connection, low, flagged, now))
+    return events
+
+
+def low_stock_counts(db: Session):
+    """(low but in stock, out of stock) live product counts from the set"""
+    row = db.execute(
+        select(
+            func.count(case((LowStockProduct.stock > 0, 1))),
+            func.count(case((LowStockProduct.stock == 0, 1))),
+        )
+    ).one()
+    return row[0], row[1]
+
+
+class StockAlertBroker:
+    """Fans committed crossings out to SSE subscribers and the webhook"""
+
+    def __init__(self, webhook_url: str = "", queue_size: int = ALERT_QUEUE_SIZE):
+        self.webhook_url = webhook_url
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscribers = set()  # (event loop, asyncio.Queue)
+        self._lock = threading.Lock()
+        self._webhook_queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def publish(self, events: list):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, subscriber in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, subscriber, events)
+            except RuntimeError:  # loop already closed
+                self._discard(loop, subscriber)
+        if self._thread is not None:
+            for alert in events:
+                try:
+                    self._webhook_queue.put_nowait(alert)
+                except queue.Full:
+                    self.dropped += 1
+
+    def _offer(self, subscriber: asyncio.Queue, events: list):
+        for alert in events:
+            if subscriber.full():
+                subscriber.get_nowait()  # slow client: keep the newest events
+                self.dropped += 1
+            subscriber.put_nowait(alert)
+
+    def _discard(self, loop, subscriber):
+        with self._lock:
+            self._subscribers.discard((loop, subscriber))
+
+    async def sse_stream(self, request):
+        """Server-sent events for every crossing until the client leaves"""
+        loop = asyncio.get_running_loop()
+        subscriber = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add((loop, subscriber))
+        try:
+            while not await request.is_disconnected():
+                try:
+                    alert = await asyncio.wait_for(subscriber.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {alert['event']}\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            self._discard(loop, subscriber)
+
+    def _post(self, alerts: list):
+        import requests
+
+        try:
+            response = requests.post(
+                self.webhook_url, json={"events": alerts}, timeout=LOW_STOCK_WEBHOOK_TIMEOUT
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Low-stock webhook failed for {len(alerts)} events: {e}")
+
+    def _run(self):
+        while not self._stopped.is_set() or not self._webhook_queue.empty():
+            try:
+                alerts = [self._webhook_queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+            while len(alerts) < WEBHOOK_BATCH_SIZE:
+                try:
+                    alerts.append(self._webhook_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._post(alerts)
+
+    def start(self):
+        if not self.webhook_url or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="low-stock-webhook", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the webhook thread after it sends what is queued"""
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join(timeout=LOW_STOCK_WEBHOOK_TIMEOUT + 5)
+            self._thread = None
+
+
+stock_alerts = StockAlertBroker(LOW_STOCK_WEBHOOK_URL)
+
+
+def start_stock_alerts():
+    """Re-check the whole set (the threshold may have changed) and start
+    the webhook sender; startup differences are not published"""
+    from core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        sync_low_stock(db.connection())
+        db.commit()
+    except Exception as e:
+        logger.error(f"Low-stock set check failed: {e}")
+    finally:
+        db.close()
+    stock_alerts.start()
+
+
+def stop_stock_alerts():
+    stock_alerts.stop()
+
+
+# Touched product ids are collected per transaction and re-checked just
+# before it commits; crossings are published only once it has committed.
+
+
+@event.listens_for(Session, "after_flush")
+def _record_stock_changes(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Product):
+            continue
+        if obj not in session.new and obj not in session.deleted:
+            state = inspect(obj)
+            if not any(state.attrs[name].history.has_changes() for name in STOCK_COLUMNS):
+                continue
+        session.info.setdefault("low_stock_touched", set()).add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_stock_changes(orm_execute_state):
+    if orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.bind_mapper.class_ is not Product:
+        return
+    session = orm_execute_state.session
+    if orm_execute_state.is_update:
+        # Stock changes name their products (core.inventory); any other
+        # bulk UPDATE may have changed stock or is_deleted anywhere
+        product_ids = orm_execute_state.execution_options.get("product_ids")
+        if product_ids is not None:
+            session.info.setdefault("low_stock_touched", set()).update(product_ids)
+            return
+    elif not (orm_execute_state.is_insert or orm_execute_state.is_delete):
+        return
+    session.info["low_stock_stale"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _sync_touched_products(session):
+    session.flush()
+    stale = session.info.pop("low_stock_stale", False)
+    touched = session.info.pop("low_stock_touched", None)
+    if not stale and not touched:
+        return
+    events = sync_low_stock(session.connection(), None if stale else touched)
+    if events:
+        session.info.setdefault("low_stock_events", []).extend(events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_crossings(session):
+    events = session.info.pop("low_stock_events", None)
+    if events:
+        stock_alerts.publish(events)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_stock_changes(session, previous_transaction):
+    for key in ("low_stock_touched", "low_stock_stale", "low_stock_events"):
+        session.info.pop(key, None)
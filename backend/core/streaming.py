@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, List, Literal
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from core.database import SessionLocal
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Rows fetched per round trip; also the number of rows per emitted chunk
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode_batch(rows, columns: List[str], format: ExportFormat, header: bool) -> bytes:
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(columns)
+        writer.writerows(
+            [v.isoformat() if isinstance(v, (datetime, date)) else v for v in row]
+            for row in rows
+        )
+        return buffer.getvalue().encode()
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+        for row in rows
+    ).encode()
+
+
+def iter_export(
+    build_query: Callable[[Session], object],
+    columns: List[str],
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+):
+    """Yield encoded export chunks while holding at most one batch of rows.
+
+    build_query receives a dedicated session (the request's session is closed
+    before the body is streamed) and must return a query of column tuples in
+    the same order as columns.
+    """
+    db = SessionLocal()
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if gzip else None
+    try:
+        query = build_query(db).yield_per(EXPORT_BATCH_SIZE)
+        batch = []
+        header = format == "csv"
+        for row in query:
+            batch.append(row)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                chunk = _encode_batch(batch, columns, format, header)
+                header = False
+                batch = []
+                yield compressor.compress(chunk) if compressor else chunk
+        if batch or header:
+            chunk = _encode_batch(batch, columns, format, header)
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+
+def export_response(
+    build_query: Callable[[Session], object],
+    columns: List[str],
+    filename: str,
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream a query as NDJSON or CSV in bounded memory"""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        iter_export(build_query, columns, format, gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
@@ -0,0 +1,187 @@
+"""Buffered product view counting.
+
+GET /products/{id} only bumps an in-memory counter keyed by (product, hour).
+A background thread drains the buffer every VIEW_FLUSH_SECONDS, or early once
+it is half full, into product_view_counts with batched upserts that add to
+the stored hourly totals, so each worker writes one statement per flush
+instead of one row per view. The buffer is flushed once more on shutdown.
+
+Memory is bounded by VIEW_BUFFER_MAX_KEYS distinct (product, hour) keys;
+views for new keys beyond that are dropped and logged until the next flush.
+"""
+
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import desc, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from core.logging import logger
+from models.product import Product, ProductViewCount
+
+VIEW_TRACKING_ENABLED = os.getenv("VIEW_TRACKING_ENABLED", "true").lower() in ("1", "true", "yes")
+VIEW_FLUSH_SECONDS = float(os.getenv("VIEW_FLUSH_SECONDS", 30))
+VIEW_BUFFER_MAX_KEYS = int(os.getenv("VIEW_BUFFER_MAX_KEYS", 100000))
+# Product ids per existence check (bound parameters per statement)
+VIEW_FLUSH_CHUNK = 500
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _write_counts(db: Session, rows):
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(ProductViewCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductViewCount.product_id, ProductViewCount.bucket],
+            set_={"views": ProductViewCount.views + stmt.excluded.views},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        result = db.execute(
+            update(ProductViewCount)
+            .where(
+                ProductViewCount.product_id == row["product_id"],
+                ProductViewCount.bucket == row["bucket"],
+            )
+            .values(views=ProductViewCount.views + row["views"])
+        )
+        if result.rowcount == 0:
+            db.execute(insert(ProductViewCount).values(**row))
+
+
+def write_view_counts(counts: Counter):
+    """Add {(product_id, bucket): views} to product_view_counts in one
+    transaction; counts for products that no longer exist are discarded"""
+    from core.database import SessionLocal
+
+    product_ids = sorted({product_id for product_id, _ in counts})
+    db = SessionLocal()
+    try:
+        existing = set()
+        for start in range(0, len(product_ids), VIEW_FLUSH_CHUNK):
+            chunk = product_ids[start : start + VIEW_FLUSH_CHUNK]
+            existing.update(db.execute(select(Product.id).where(Product.id.in_(chunk))).scalars())
+        # Sorted so concurrent workers lock rows in the same order
+        rows = [
+            {"product_id": product_id, "bucket": bucket, "views": views}
+            for (product_id, bucket), views in sorted(counts.items())
+            if product_id in existing
+        ]
+        if rows:
+            _write_counts(db, rows)
+            db.commit()
+    finally:
+        db.close()
+
+
+class ViewCounter:
+    """Per-(product, hour) view counts buffered between flushes"""
+
+    def __init__(self, max_keys: int, flush_seconds: float, enabled: bool = True):
+        self.max_keys = max_keys
+        self.flush_seconds = flush_seconds
+        self.enabled = enabled
+        self.dropped = 0
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record(self, product_id: int):
+        if not self.enabled:
+            return
+        key = (product_id, hour_bucket(datetime.utcnow()))
+        with self._lock:
+            if key not in self._counts and len(self._counts) >= self.max_keys:
+                self.dropped += 1
+                return
+            self._counts[key] += 1
+            size = len(self._counts)
+        if size >= self.max_keys // 2:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+    def flush(self) -> int:
+        """Write the buffered counts; returns the number of views written"""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                logger.warning(f"View buffer full: dropped {dropped} product views")
+            if not counts:
+                return 0
+            try:
+                write_view_counts(counts)
+            except Exception as e:
+                logger.error(f"Flushing {len(counts)} view counts failed: {e}")
+                self._restore(counts)
+                return 0
+            return sum(counts.values())
+
+    def _restore(self, counts: Counter):
+        """Put unwritten counts back for the next flush, within the bound"""
+        with self._lock:
+            for key, views in counts.items():
+                if key in self._counts or len(self._counts) < self.max_keys:
+                    self._counts[key] += views
+                else:
+                    self.dropped += views
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.flush()
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write what is still buffered"""
+        if self._thread is not None:
+            self._stopped.set()
+            self._wake.set()
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+
+view_counter = ViewCounter(VIEW_BUFFER_MAX_KEYS, VIEW_FLUSH_SECONDS, VIEW_TRACKING_ENABLED)
+
+
+def top_viewed_products(db: Session, start_date: datetime, end_date: datetime, limit: int = 10):
+    """Live products with the most views between the two dates (whole hours;
+    views still buffered in memory are not included)"""
+    views = func.sum(ProductViewCount.views).label("views")
+    rows = (
+        db.query(Product.id, Product.name, views)
+        .select_from(ProductViewCount)
+        .join(Product, Product.id == ProductViewCount.product_id)
+        .filter(
+            ProductViewCount.bucket >= hour_bucket(start_date),
+            ProductViewCount.bucket < hour_bucket(end_date) + timedelta(hours=1),
+            Product.is_deleted == False,
+        )
+        .group_by(Product.id, Product.name)
+        .order_by(desc("views"), Product.id)
+        .limit(limit)
+        .all()
+    )
+    return [{"id": row.id, "name": row.name, "views": int(row.views)} for row in rows]
@@ -1,6 +1,4 @@
 from fastapi import FastAPI, Depends, Request, HTTPException, Response
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
 from models import Base
 import os
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,17 +9,47 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from core.logging import logger
 from api import api_version_one
 from fastapi.staticfiles import StaticFiles
+from core.database import engine, SessionLocal, get_db, replica_set
+from core.replicas import db_read_only, db_request_user
+from core.security import decode_token
+from core.query_stats import start_query_stats
+from core.search import ensure_search_index
+from core.cache import start_invalidation_listener, stop_invalidation_listener
+from core.images import shutdown_image_workers
+from core.suggest import start_suggest_index, stop_suggest_index
+from core.views import view_counter
+from core.stock_alerts import start_stock_alerts, stop_stock_alerts
+from core.outbox import start_outbox_worker, stop_outbox_worker
+from core.email_utils import close_smtp_pool, precompile_templates
+from contextlib import asynccontextmanager
 
 
-
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ecommerce.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 # Create tables (for dev/demo; use Alembic for production)
 Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+ensure_search_index(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    replica_set.start_health_checks()
+    start_invalidation_listener()
+    start_suggest_index()
+    view_counter.start()
+    start_stock_alerts()
+    precompile_templates()
+    start_outbox_worker()
+    yield
+    stop_outbox_worker()
+    close_smtp_pool()
+    stop_stock_alerts()
+    view_counter.stop()
+    stop_suggest_index()
+    stop_invalidation_listener()
+    shutdown_image_workers()
+    replica_set.stop_health_checks()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -43,14 +71,6 @@ CSRF_COOKIE_NAME = "csrftoken"
 CSRF_HEADER_NAME = "x-csrf-token"
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the E-commerce API!"}
@@ -73,12 +93,32 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@app.middleware("http")
+async def route_database(request: Request, call_next):
+    """Mark read-only requests (and who sent them) for replica routing"""
+    db_read_only.set(request.method in READ_ONLY_METHODS)
+    token = request.cookies.get("access_token")
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    payload = decode_token(token) if token else None
+    db_request_user.set(payload.get("sub") if payload else None)
+    return await call_next(request)
+
+
 @app.middleware("http")
 async def log_requests(request, call_next):
     user = request.cookies.get("access_token", "anonymous")
     logger.info(f"Request: {request.method} {request.url.path} user={user}")
+    query_stats = start_query_stats(f"{request.method} {request.url.path}")
     response = await call_next(request)
+    response.headers["X-DB-Queries"] = str(query_stats.count)
+    response.headers["X-DB-Time"] = f"{query_stats.total_ms:.2f}"
     logger.info(
-        f"Response: {request.method} {request.url.path} status={response.status_code} user={user}"
+        f"Response: {request.method} {request.url.path} status={response.status_code} user={user} "
+        f"db_queries={query_stats.count} db_time_ms={query_stats.total_ms:.2f}"
     )
     return response
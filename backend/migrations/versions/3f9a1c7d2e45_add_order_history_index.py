@@ -0,0 +1,28 @@
+"""add order history index
+
+Revision ID: 3f9a1c7d2e45
+Revises: 02c62822be5f
+Create Date: 2026-10-17 09:12:31.482113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2e45'
+down_revision: Union[str, None] = '02c62822be5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_order_user_created', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_order_user_created', table_name='orders')
@@ -0,0 +1,42 @@
+"""add low stock products
+
+Revision ID: 4a8c2f6e1d37
+Revises: 7c3d5e9f1a24
+Create Date: 2026-10-17 16:21:09.274113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a8c2f6e1d37'
+down_revision: Union[str, None] = '7c3d5e9f1a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('low_stock_products',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('flagged_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index(op.f('ix_low_stock_products_stock'), 'low_stock_products', ['stock'], unique=False)
+    # Default LOW_STOCK_THRESHOLD; the app re-checks the set on startup
+    op.execute(
+        "INSERT INTO low_stock_products (product_id, stock, flagged_at) "
+        "SELECT id, stock, CURRENT_TIMESTAMP FROM products "
+        "WHERE stock < 10 AND is_deleted = false"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_low_stock_products_stock'), table_name='low_stock_products')
+    op.drop_table('low_stock_products')
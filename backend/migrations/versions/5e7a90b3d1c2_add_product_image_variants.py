@@ -0,0 +1,31 @@
+"""add product image variants
+
+Revision ID: 5e7a90b3d1c2
+Revises: c41d7e2a8f06
+Create Date: 2026-10-17 12:02:44.187305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a90b3d1c2'
+down_revision: Union[str, None] = 'c41d7e2a8f06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('image_hash', sa.String(), nullable=True))
+    op.add_column('products', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('image_variants')
+        batch_op.drop_column('image_hash')
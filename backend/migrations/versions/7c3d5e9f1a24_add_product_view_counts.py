@@ -0,0 +1,36 @@
+"""add product view counts
+
+Revision ID: 7c3d5e9f1a24
+Revises: e2f18a4c6b97
+Create Date: 2026-10-17 15:02:41.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3d5e9f1a24'
+down_revision: Union[str, None] = 'e2f18a4c6b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_view_counts',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('views', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'bucket')
+    )
+    op.create_index('idx_view_bucket_product', 'product_view_counts', ['bucket', 'product_id', 'views'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_view_bucket_product', table_name='product_view_counts')
+    op.drop_table('product_view_counts')
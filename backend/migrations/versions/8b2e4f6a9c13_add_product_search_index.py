@@ -0,0 +1,45 @@
+"""add product search index
+
+Revision ID: 8b2e4f6a9c13
+Revises: 3f9a1c7d2e45
+Create Date: 2026-10-17 10:04:52.219840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.search import (
+    POSTGRES_INDEX_DDL,
+    SQLITE_FTS_DDL,
+    SQLITE_FTS_DROP,
+    SQLITE_FTS_REBUILD,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4f6a9c13'
+down_revision: Union[str, None] = '3f9a1c7d2e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL + [SQLITE_FTS_REBUILD]:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute(POSTGRES_INDEX_DDL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_products_search')
@@ -0,0 +1,33 @@
+"""add product sku
+
+Revision ID: 9d3b6c1e7a58
+Revises: 5e7a90b3d1c2
+Create Date: 2026-10-17 12:48:19.604731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6c1e7a58'
+down_revision: Union[str, None] = '5e7a90b3d1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('sku', sa.String(), nullable=True))
+    # Unique index rather than a constraint so SQLite needs no table rebuild;
+    # it is also the conflict target of the bulk import upsert.
+    op.create_index('uq_products_sku', 'products', ['sku'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_products_sku', table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('sku')
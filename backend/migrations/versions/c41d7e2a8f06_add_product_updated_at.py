@@ -0,0 +1,32 @@
+"""add product updated_at
+
+Revision ID: c41d7e2a8f06
+Revises: 8b2e4f6a9c13
+Create Date: 2026-10-17 11:20:07.553918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2a8f06'
+down_revision: Union[str, None] = '8b2e4f6a9c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE products SET updated_at = COALESCE(deleted_at, created_at)')
+    op.create_index(op.f('ix_products_updated_at'), 'products', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_updated_at'), table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,55 @@
+"""add product facets
+
+Revision ID: e2f18a4c6b97
+Revises: 9d3b6c1e7a58
+Create Date: 2026-10-17 13:31:56.870412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f18a4c6b97'
+down_revision: Union[str, None] = '9d3b6c1e7a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('category', sa.String(), nullable=True))
+    op.add_column('products', sa.Column('brand', sa.String(), nullable=True))
+    op.create_index(op.f('ix_products_category'), 'products', ['category'], unique=False)
+    op.create_index(op.f('ix_products_brand'), 'products', ['brand'], unique=False)
+    op.create_index('idx_product_category_deleted', 'products', ['category', 'is_deleted'], unique=False)
+    op.create_index('idx_product_brand_deleted', 'products', ['brand', 'is_deleted'], unique=False)
+    op.create_table('product_tags',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'tag')
+    )
+    op.create_index('idx_product_tag_product', 'product_tags', ['tag', 'product_id'], unique=False)
+    op.create_table('facet_counts',
+    sa.Column('facet', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('facet_counts')
+    op.drop_index('idx_product_tag_product', table_name='product_tags')
+    op.drop_table('product_tags')
+    op.drop_index('idx_product_brand_deleted', table_name='products')
+    op.drop_index('idx_product_category_deleted', table_name='products')
+    op.drop_index(op.f('ix_products_brand'), table_name='products')
+    op.drop_index(op.f('ix_products_category'), table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('brand')
+        batch_op.drop_column('category')
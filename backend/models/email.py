@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from .base import Base
+
+
+class EmailOutbox(Base):
+    """Queued transactional email, delivered by core.outbox workers"""
+
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    to = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    html_body = Column(Text, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # pending | sending | sent | dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)  # lease while sending
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+# Workers claim due rows by status, oldest first
+Index("idx_outbox_status_next", EmailOutbox.status, EmailOutbox.next_attempt_at)
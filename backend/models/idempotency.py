@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from .base import Base
+
+
+class IdempotencyKey(Base):
+    """Client Idempotency-Key of a mutating request and its stored response"""
+
+    __tablename__ = "idempotency_keys"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method + path
+    status = Column(String, nullable=False, default="in_progress")  # in_progress | completed
+    locked_until = Column(DateTime, nullable=True)  # lease while in progress
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+
+# One key per user; expired keys are purged by expires_at range
+Index("uq_idempotency_user_key", IdempotencyKey.user_id, IdempotencyKey.key, unique=True)
+Index("idx_idempotency_expires", IdempotencyKey.expires_at)
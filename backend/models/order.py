@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -16,3 +16,34 @@ class Order(Base):
     deleted_at = Column(DateTime, nullable=True)
     user = relationship("User", back_populates="orders")
     shipping_address = relationship("Address")
+    items = relationship(
+        "OrderItem",
+        back_populates="order",
+        cascade="all, delete-orphan",
+        order_by="OrderItem.id",
+    )
+
+
+class OrderItem(Base):
+    """One product line of an order, with the name and unit price it sold at"""
+
+    __tablename__ = "order_items"
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(
+        Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_name = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    order = relationship("Order", back_populates="items")
+
+    @property
+    def total(self):
+        return self.price * self.quantity
+
+
+# Keyset pagination of a user's order history walks this index
+Index("idx_order_user_created", Order.user_id, Order.created_at, Order.id)
+# Per-product sales aggregates read line items by product, then their orders
+Index("idx_order_item_product_order", OrderItem.product_id, OrderItem.order_id)
@@ -1,4 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, Index
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    Text,
+    DateTime,
+    Boolean,
+    Index,
+    JSON,
+    ForeignKey,
+)
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
 
@@ -7,16 +19,97 @@ class Product(Base):
     __tablename__ = "products"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
+    sku = Column(String, nullable=True)  # bulk import upsert key
     description = Column(Text, index=True)
+    category = Column(String, nullable=True, index=True)
+    brand = Column(String, nullable=True, index=True)
     price = Column(Float, nullable=False, index=True)
     image_url = Column(String)
+    # Content hash of the latest upload; its derivatives fill image_variants
+    image_hash = Column(String, nullable=True)
+    image_variants = Column(JSON, nullable=True)  # variant -> format -> URL
     stock = Column(Integer, default=0, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Bumped on every UPDATE; drives ETags and the catalog collection version
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
     is_deleted = Column(Boolean, default=False, index=True)
     deleted_at = Column(DateTime, nullable=True)
+    tag_links = relationship(
+        "ProductTag", cascade="all, delete-orphan", lazy="selectin"
+    )
+
+    @property
+    def tags(self):
+        return sorted(link.tag for link in self.tag_links)
+
+    @tags.setter
+    def tags(self, values):
+        wanted = {normalize_tag(v) for v in values or []} - {""}
+        self.tag_links = [link for link in self.tag_links if link.tag in wanted]
+        current = {link.tag for link in self.tag_links}
+        self.tag_links.extend(ProductTag(tag=tag) for tag in sorted(wanted - current))
+        # Tag rows live in their own table; bump the product's version too
+        self.updated_at = datetime.utcnow()
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lower()
+
+
+class ProductTag(Base):
+    __tablename__ = "product_tags"
+    product_id = Column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    tag = Column(String, primary_key=True)
+
+
+class FacetCount(Base):
+    """Live-product count per facet value, maintained by core.facets"""
+
+    __tablename__ = "facet_counts"
+    facet = Column(String, primary_key=True)  # category | brand | tag
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ProductViewCount(Base):
+    """Product page views per hour, written in batches by core.views"""
+
+    __tablename__ = "product_view_counts"
+    product_id = Column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket = Column(DateTime, primary_key=True)  # start of the hour, UTC
+    views = Column(Integer, nullable=False, default=0)
+
+
+class LowStockProduct(Base):
+    """Live products below LOW_STOCK_THRESHOLD, maintained by core.stock_alerts"""
+
+    __tablename__ = "low_stock_products"
+    product_id = Column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    stock = Column(Integer, nullable=False, index=True)
+    flagged_at = Column(DateTime, default=datetime.utcnow)  # when it went low
 
 
 # Composite indexes for common queries
 Index("idx_product_name_deleted", Product.name, Product.is_deleted)
 Index("idx_product_price_stock", Product.price, Product.stock)
 Index("idx_product_created_deleted", Product.created_at, Product.is_deleted)
+Index("uq_products_sku", Product.sku, unique=True)
+Index("idx_product_category_deleted", Product.category, Product.is_deleted)
+Index("idx_product_brand_deleted", Product.brand, Product.is_deleted)
+Index("idx_product_tag_product", ProductTag.tag, ProductTag.product_id)
+
+# Top-viewed reports scan a bucket range and sum views per product
+Index(
+    "idx_view_bucket_product",
+    ProductViewCount.bucket,
+    ProductViewCount.product_id,
+    ProductViewCount.views,
+)
@@ -7,7 +7,7 @@ class SalesAnalytics(BaseModel):
     total_sales: float
     total_orders: int
     average_order_value: float
-    sales_by_month: List[Dict[str, float]]
+    sales_by_month: List[Dict[str, Any]]  # {"month": "YYYY-MM", "sales": float}
     top_selling_products: List[Dict[str, Any]]
     revenue_growth: float  # percentage
 
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -9,6 +9,10 @@ class ProductBase(BaseModel):
     price: float = Field(..., gt=0)
     image_url: Optional[HttpUrl] = None
     stock: int = Field(0, ge=0)
+    sku: Optional[str] = Field(None, min_length=1, max_length=64)
+    category: Optional[str] = Field(None, min_length=1, max_length=64)
+    brand: Optional[str] = Field(None, min_length=1, max_length=64)
+    tags: Optional[List[str]] = Field(None, max_length=32)
 
 
 class ProductCreate(ProductBase):
@@ -21,12 +25,23 @@ class ProductUpdate(ProductBase):
 
 class ProductOut(ProductBase):
     id: int
+    # Stored URLs may be relative /static paths
+    image_url: Optional[str] = None
+    # thumbnail/listing/detail -> webp/jpeg -> URL; None while rendering
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
+    tags: List[str] = []
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class ProductSuggestion(BaseModel):
+    id: int
+    name: str
+
+
 class ProductSearch(BaseModel):
     query: Optional[str] = None
     min_price: Optional[float] = Field(None, ge=0)
@@ -40,3 +55,59 @@ class ProductFilter(BaseModel):
     category: Optional[str] = None
     brand: Optional[str] = None
     tags: Optional[List[str]] = None
+
+
+class ProductImportRow(BaseModel):
+    """One product in a bulk import; rows are upserted by sku"""
+
+    sku: str = Field(..., min_length=1, max_length=64)
+    name: str = Field(..., min_length=1, max_length=128)
+    description: Optional[str] = Field(None, max_length=1024)
+    price: float = Field(..., gt=0)
+    stock: int = Field(0, ge=0)
+    image_url: Optional[str] = None
+
+
+class ImportRowError(BaseModel):
+    line: int
+    sku: Optional[str] = None
+    errors: List[str]
+
+
+class ProductImportResult(BaseModel):
+    rows: int
+    upserted: int
+    failed: int
+    batches: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+
+class StockAdjustment(BaseModel):
+    """Change one product's stock by delta, or set it to absolute"""
+
+    product_id: int
+    delta: Optional[int] = None
+    absolute: Optional[int] = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def one_of_delta_or_absolute(self):
+        if (self.delta is None) == (self.absolute is None):
+            raise ValueError("Give exactly one of delta or absolute")
+        return self
+
+
+class StockLevel(BaseModel):
+    product_id: int
+    stock: int
+
+
+class RejectedStockAdjustment(BaseModel):
+    product_id: int
+    reason: str
+    stock: Optional[int] = None  # current stock when the result would be negative
+
+
+class BulkStockResult(BaseModel):
+    updated: List[StockLevel]
+    rejected: List[RejectedStockAdjustment]
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Run from anywhere: the backend modules are imported top-level (core, models, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the app creates its tables; keep them away from ./ecommerce.db
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'dshop_test.db')}"
+)
+
+import api  # noqa: E402,F401  (registers every mapper)
+from core.database import engine  # noqa: E402
+from models.base import Base  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "no-returning"])
+def update_returning(request, monkeypatch):
+    """Run a test with and without UPDATE ... RETURNING (MySQL has none)"""
+    monkeypatch.setattr(engine.dialect, "update_returning", request.param)
+    return request.param
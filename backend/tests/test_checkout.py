@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from api.orders import checkout_cart
+from core.database import SessionLocal
+from models.cart import Cart, CartItem
+from models.order import Order
+from models.product import Product
+from models.user import User
+
+
+@pytest.fixture
+def db(update_returning):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def _customer_with_cart(db, quantities):
+    user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x", full_name="Buyer")
+    db.add(user)
+    db.flush()
+    cart = Cart(user_id=user.id)
+    db.add(cart)
+    db.flush()
+    for product, quantity in quantities:
+        db.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=quantity))
+    db.commit()
+    return user
+
+
+def test_checkout_reserves_stock_for_the_whole_cart(db):
+    first = Product(name="Mug", price=4.0, stock=5)
+    second = Product(name="Cup", price=2.5, stock=2)
+    db.add_all([first, second])
+    db.commit()
+    user = _customer_with_cart(db, [(first, 2), (second, 2)])
+
+    order, items = checkout_cart(db, user)
+
+    assert order.total_amount == 13.0
+    assert [item["quantity"] for item in items] == [2, 2]
+    db.expire_all()
+    assert (db.get(Product, first.id).stock, db.get(Product, second.id).stock) == (3, 0)
+
+
+def test_checkout_shortfall_leaves_stock_untouched(db):
+    plenty = Product(name="Plate", price=3.0, stock=5)
+    scarce = Product(name="Bowl", price=3.0, stock=1)
+    db.add_all([plenty, scarce])
+    db.commit()
+    user = _customer_with_cart(db, [(plenty, 1), (scarce, 2)])
+
+    with pytest.raises(HTTPException) as raised:
+        checkout_cart(db, user)
+
+    assert raised.value.status_code == 400
+    db.expire_all()
+    assert (db.get(Product, plenty.id).stock, db.get(Product, scarce.id).stock) == (5, 1)
+    assert db.query(Order).filter(Order.user_id == user.id).count() == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from core.database import SessionLocal
+from core.inventory import apply_stock_changes
+from models.product import Product
+
+
+@pytest.fixture
+def db(update_returning):
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+
+
+def _products(db, *stocks):
+    products = [
+        Product(name=f"Stock {i}", price=1.0, stock=stock) for i, stock in enumerate(stocks)
+    ]
+    db.add_all(products)
+    db.flush()
+    return [product.id for product in products]
+
+
+def test_guarded_changes_apply_or_reject_per_product(db):
+    enough, short, replaced, deleted = _products(db, 5, 1, 3, 4)
+    db.get(Product, deleted).is_deleted = True
+    db.flush()
+
+    updated, rejected = apply_stock_changes(
+        db,
+        {
+            enough: (None, -2),
+            short: (None, -2),
+            replaced: (10, -1),
+            deleted: (None, 1),
+            999999: (None, 1),
+        },
+    )
+
+    assert updated == {enough: 3, replaced: 9}
+    assert sorted(rejected) == sorted([short, deleted, 999999])
+    db.expire_all()
+    stock = [db.get(Product, pid).stock for pid in (enough, short, replaced, deleted)]
+    assert stock == [3, 1, 9, 4]
@@ -0,0 +1,26 @@
+import uuid
+
+from core.database import SessionLocal
+from core.outbox import claim_batch, enqueue_email
+from models.email import EmailOutbox
+
+
+def test_claimed_emails_are_leased_once(update_returning):
+    db = SessionLocal()
+    try:
+        to = f"{uuid.uuid4().hex}@example.com"
+        enqueue_email(db, to, "First", "body")
+        enqueue_email(db, to, "Second", "body")
+        db.commit()
+
+        claimed = [email for email in claim_batch(db, limit=1000) if email.to == to]
+
+        assert [(email.subject, email.attempts) for email in claimed] == [
+            ("First", 1),
+            ("Second", 1),
+        ]
+        statuses = db.query(EmailOutbox.status).filter(EmailOutbox.to == to).all()
+        assert {status for (status,) in statuses} == {"sending"}
+        assert not [email for email in claim_batch(db, limit=1000) if email.to == to]
+    finally:
+        db.close()
@@ -0,0 +1,54 @@
+import re
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.orm import Query, Session
+
+from core.pagination import _count_cache_key, _estimated_count
+from models.product import Product
+
+
+class ExplainSession:
+    """Stands in for a PostgreSQL session; records the EXPLAIN it is sent"""
+
+    def __init__(self, plan_rows: int):
+        self.plan_rows = plan_rows
+        self.statements = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=psycopg2.dialect())
+
+    def connection(self):
+        return self
+
+    def exec_driver_sql(self, sql, params):
+        self.statements.append((sql, params))
+        return SimpleNamespace(scalar=lambda: [{"Plan": {"Plan Rows": self.plan_rows}}])
+
+
+def test_estimated_count_expands_in_filters():
+    session = ExplainSession(plan_rows=42)
+    query = Query(Product, session).filter(
+        Product.id.in_([1, 2, 3]), Product.is_deleted == False
+    )
+
+    assert _estimated_count(query) == 42
+
+    [(sql, params)] = session.statements
+    assert sql.startswith("EXPLAIN (FORMAT JSON) ")
+    assert "POSTCOMPILE" not in sql
+    placeholders = set(re.findall(r"%\((\w+)\)s", sql))
+    assert placeholders == set(params)
+    assert sorted(v for k, v in params.items() if k.startswith("id_")) == [1, 2, 3]
+
+
+def test_count_cache_key_distinguishes_in_lists():
+    session = Session(bind=create_engine("sqlite://"))
+
+    def key(ids):
+        return _count_cache_key(session.query(Product).filter(Product.id.in_(ids)))
+
+    assert "POSTCOMPILE" not in key([1, 2])[0]
+    assert key([1, 2]) != key([1, 2, 3])
+    assert key([1, 2]) == key([1, 2])
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from core.database import SessionLocal
+from core.inventory import apply_stock_changes
+from core.stock_alerts import _upsert_flags
+from models.product import LowStockProduct, Product
+
+
+def test_stock_changes_touch_only_their_products():
+    db = SessionLocal()
+    try:
+        apply_stock_changes(db, {1: (5, 0), 2: (None, -1)})
+
+        assert db.info["low_stock_touched"] == {1, 2}
+        assert "low_stock_stale" not in db.info
+        assert "suggest_stale" not in db.info
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_untagged_bulk_updates_mark_indexes_stale():
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Product)
+            .where(Product.id == 1)
+            .values(name="Renamed")
+            .execution_options(synchronize_session=False)
+        )
+
+        assert db.info["low_stock_stale"] is True
+        assert db.info["suggest_stale"] is True
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_flagging_an_already_flagged_product_updates_it(monkeypatch):
+    db = SessionLocal()
+    try:
+        product = Product(name="Kettle", price=20.0, stock=2)
+        db.add(product)
+        db.flush()
+        connection = db.connection()
+        # Neither ON CONFLICT nor ON DUPLICATE KEY: update, then insert
+        monkeypatch.setattr(connection.dialect, "name", "generic")
+        flagged_at = datetime.utcnow()
+        for stock in (2, 1):
+            _upsert_flags(
+                connection, [{"product_id": product.id, "stock": stock, "flagged_at": flagged_at}]
+            )
+        monkeypatch.undo()
+
+        flags = db.execute(
+            select(LowStockProduct.stock).where(LowStockProduct.product_id == product.id)
+        ).scalars().all()
+        assert flags == [1]
+    finally:
+        db.rollback()
+        db.close()
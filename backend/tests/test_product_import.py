@@ -0,0 +1,19 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import mysql
+
+from core.product_import import UPSERT_COLUMNS, _upsert_statement
+
+
+def test_mysql_upsert_updates_on_duplicate_sku():
+    sql = str(_upsert_statement("mysql").compile(dialect=mysql.dialect()))
+
+    assert "ON DUPLICATE KEY UPDATE" in sql
+    for name in UPSERT_COLUMNS:
+        assert f"{name} = VALUES({name})" in sql
+
+
+def test_unsupported_dialect_is_a_client_visible_error():
+    with pytest.raises(HTTPException) as raised:
+        _upsert_statement("oracle")
+    assert raised.value.status_code == 501
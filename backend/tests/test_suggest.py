@@ -0,0 +1,44 @@
+import uuid
+
+from core.database import SessionLocal
+from core.suggest import SuggestIndex
+from models.cart import Cart, CartItem
+from models.product import Product
+from models.user import User
+
+
+def test_popularity_changes_reorder_suggestions():
+    index = SuggestIndex()
+    index.begin_load()
+    index.load([(1, "Red lamp"), (2, "Red lantern")], {1: 3, 2: 1})
+
+    index.add_popularity({2: 5, 99: 1})
+
+    assert index.suggest("red la") == [(2, "Red lantern"), (1, "Red lamp")]
+    assert index.scores == {1: 3, 2: 6}
+
+
+def test_cart_writes_update_popularity(monkeypatch):
+    db = SessionLocal()
+    try:
+        product = Product(name="Teapot", price=9.0, stock=3)
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add_all([product, user])
+        db.commit()
+        index = SuggestIndex()
+        index.begin_load()
+        index.load([(product.id, product.name)], {})
+        monkeypatch.setattr("core.suggest.suggest_index", index)
+        cart = Cart(user_id=user.id)
+        db.add(cart)
+        db.flush()
+        item = CartItem(cart_id=cart.id, product_id=product.id, quantity=2)
+        db.add(item)
+        db.commit()
+        assert index.scores[product.id] == 1
+
+        db.delete(item)
+        db.commit()
+        assert index.scores[product.id] == 0
+    finally:
+        db.close()